@@ -1 +1,32 @@
+import os
+
 GRID_SIZE = 100
+
+# resolve mouse picks with lattice arithmetic instead of ray casting the grid
+LATTICE_PICKING = True
+
+# number of built grids kept in memory, and where they are cached between runs
+GRID_CACHE_SIZE = 4
+GRID_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'draw-poly')
+# cache files kept on disk, the least recently used ones are deleted beyond that
+GRID_CACHE_FILES = 16
+
+# Level of detail: below LOD_PIXELS pixels per lattice unit the grid is drawn as one texture of at
+# most MAX_TEXTURE_SIZE texels a side, above it as tiles of TILE_SIZE units, only the ones in view
+LOD_PIXELS = 4
+TILE_SIZE = 32
+MAX_TEXTURE_SIZE = 4096
+# closest zoom, as the parallel scale (half the view height in lattice units)
+MIN_PARALLEL_SCALE = 0.5
+
+# minimum time between two renders in ms, edits in between are drawn together
+RENDER_INTERVAL = 16
+
+# number of edits that can be undone
+HISTORY_LIMIT = 200
+
+# Opt-in latency instrumentation, see instrument.py. Set DRAW_POLY_TRACE to the Chrome trace file
+# to write on exit, and DRAW_POLY_TRACE_OVERLAY=1 to also draw the frame rate in the view.
+TRACE_PATH = os.environ.get('DRAW_POLY_TRACE') or None
+TRACE_OVERLAY = os.environ.get('DRAW_POLY_TRACE_OVERLAY') == '1'
+TRACE_EVENT_LIMIT = 1000000
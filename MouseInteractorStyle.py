@@ -1,10 +1,20 @@
 from vtkmodules.vtkInteractionStyle import vtkInteractorStyleImage
 from vtkmodules.vtkRenderingCore import vtkCellPicker
 from vtkmodules.vtkCommonCore import vtkIdList
+from Constant import MIN_PARALLEL_SCALE
+from instrument import traced
+
+
+def display_to_world(renderer, x, y):
+    renderer.SetDisplayPoint(x, y, 0)
+    renderer.DisplayToWorld()
+    world = renderer.GetWorldPoint()
+    return world[0] / world[3], world[1] / world[3]
 
 
 class MouseInteractorStyle(vtkInteractorStyleImage):
-    def __init__(self, data, select_callback, change_callback, center_points, *args, **kwargs):
+    def __init__(self, data, select_callback, change_callback, center_points, lattice=None, stroke_callback=None,
+                 region_callback=None, fill_callback=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.AddObserver('LeftButtonPressEvent', self.left_button_press_event)
         self.AddObserver('LeftButtonReleaseEvent', self.left_button_release_event)
@@ -17,51 +27,78 @@ class MouseInteractorStyle(vtkInteractorStyleImage):
         self.data = data
         self.callback_select = select_callback
         self.callback_change = change_callback
+        # told when a paint stroke starts (True) and ends (False)
+        self.callback_stroke = stroke_callback
+        # told the outline of a box or lasso drag in display coordinates, and whether it is finished
+        self.callback_region = region_callback
+        # told the center clicked with the fill tool
+        self.callback_fill = fill_callback
+        # 'paint' selects the centers under the mouse, 'box' and 'lasso' the ones inside a dragged region,
+        # 'fill' the region around the clicked center
+        self.tool = 'paint'
+        self.region = []
         self.center_points = center_points
+        # with a lattice, picks are resolved arithmetically instead of ray casting the grid
+        # farthest zoom as the parallel scale, VTKControl fits it to the grid
+        self.max_scale = 20
+        self.lattice = lattice
+        self.picker = vtkCellPicker()
+        self.picker.SetTolerance(0.0005)
         # self.callback_save = save_callback
         self.point_list = set()
         self.mouse_clicked = False
         self.remove_mode = False
+        self.last_point_id = -1
 
     def pick_cell(self):
         # Get the location of the click (in window coordinates)
         pos = self.GetInteractor().GetEventPosition()
 
-        picker = vtkCellPicker()
-        picker.SetTolerance(0.0005)
-
         # Pick from this location.
-        picker.Pick(pos[0], pos[1], 0, self.GetDefaultRenderer())
+        self.picker.Pick(pos[0], pos[1], 0, self.GetDefaultRenderer())
+
+        return self.picker.GetCellId()
 
-        return picker.GetCellId()
+    @traced
+    def pick_center(self):
+        if self.lattice is not None:
+            pos = self.GetInteractor().GetEventPosition()
+            x, y = display_to_world(self.GetDefaultRenderer(), pos[0], pos[1])
+            return int(self.lattice.locate_center(x, y))
+
+        cell_id = self.pick_cell()
+        if cell_id != -1:
+            pt = vtkIdList()
+            self.data.GetCellPoints(cell_id, pt)
+            for i in range(pt.GetNumberOfIds()):
+                if pt.GetId(i) in self.center_points:
+                    return pt.GetId(i)
+        return -1
 
+    @traced
     def scroll_event(self, obj, event):
         scale = self.GetDefaultRenderer().GetActiveCamera().GetParallelScale()
         if event == 'MouseWheelForwardEvent':
-            if scale < 2:
+            if scale < MIN_PARALLEL_SCALE:
                 return
             self.OnMouseWheelForward()
         elif event == 'MouseWheelBackwardEvent':
-            if scale > 20:
+            if scale > self.max_scale:
                 return
             self.OnMouseWheelBackward()
 
+    @traced
     def right_button_press_event(self, obj, event):
         if self.GetInteractor().GetShiftKey() or self.GetInteractor().GetControlKey():
             return
-        cell_id = self.pick_cell()
+        point_id = self.pick_center()
 
-        if cell_id != -1:
-            poly = self.data
-            pt = vtkIdList()
-            poly.GetCellPoints(cell_id, pt)
-
-            for i in range(pt.GetNumberOfIds()):
-                if pt.GetId(i) in self.center_points:
-                    self.callback_change(pt.GetId(i))
+        if point_id != -1:
+            self.callback_change(point_id)
 
         # self.OnRightButtonDown()
 
+    @traced
     def left_button_press_event(self, obj, event):
         if self.GetInteractor().GetShiftKey():
             return
@@ -69,41 +106,66 @@ class MouseInteractorStyle(vtkInteractorStyleImage):
         self.remove_mode = False
         if self.GetInteractor().GetControlKey():
             self.remove_mode = True
+        if self.tool == 'fill':
+            point_id = self.pick_center()
+            if point_id != -1 and self.callback_fill is not None:
+                self.callback_fill(point_id, self.remove_mode)
+            return
         self.mouse_clicked = True
+        if self.tool != 'paint' and self.callback_region is not None:
+            self.region = [self.GetInteractor().GetEventPosition()]
+            return
+        if self.callback_stroke is not None:
+            self.callback_stroke(True)
 
-        cell_id = self.pick_cell()
+        point_id = self.pick_center()
+        self.last_point_id = point_id
 
-        if cell_id != -1:
-            poly = self.data
-            pt = vtkIdList()
-            poly.GetCellPoints(cell_id, pt)
-
-            for i in range(pt.GetNumberOfIds()):
-                if pt.GetId(i) in self.center_points:
-                    self.callback_select(pt.GetId(i), self.remove_mode)
+        if point_id != -1:
+            self.callback_select(point_id, self.remove_mode)
 
         # Forward events
         # self.OnLeftButtonDown()
 
+    @traced
     def mouse_move_event(self, obj, event):
-        if self.mouse_clicked:
-            cell_id = self.pick_cell()
+        if self.mouse_clicked and self.region:
+            self.extend_region()
+        elif self.mouse_clicked:
+            point_id = self.pick_center()
 
-            if cell_id != -1:
-                poly = self.data
-                pt = vtkIdList()
-                poly.GetCellPoints(cell_id, pt)
-
-                for i in range(pt.GetNumberOfIds()):
-                    if pt.GetId(i) in self.center_points:
-                        self.callback_select(pt.GetId(i), self.remove_mode)
+            # moving inside the cell painted last time changes nothing
+            if point_id != -1 and point_id != self.last_point_id:
+                self.last_point_id = point_id
+                self.callback_select(point_id, self.remove_mode)
 
         self.OnMouseMove()
 
+    @traced
     def left_button_release_event(self, obj, event):
+        if self.region:
+            outline = self.region_outline()
+            self.region = []
+            self.callback_region(outline, self.remove_mode, True)
+        elif self.mouse_clicked and self.callback_stroke is not None:
+            self.callback_stroke(False)
         self.mouse_clicked = False
 
         self.OnLeftButtonUp()
 
+    def extend_region(self):
+        pos = self.GetInteractor().GetEventPosition()
+        if self.tool == 'box':
+            self.region[1:] = [pos]
+        elif pos != self.region[-1]:
+            self.region.append(pos)
+        self.callback_region(self.region_outline(), self.remove_mode, False)
+
+    def region_outline(self):
+        if self.tool == 'box':
+            (x0, y0), (x1, y1) = self.region[0], self.region[-1]
+            return [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+        return list(self.region)
+
     def char_event(self, obj, event):
         return
@@ -1,44 +1,72 @@
 from vtkmodules.vtkInteractionStyle import vtkInteractorStyleImage
 from vtkmodules.vtkRenderingCore import vtkPointPicker
+from Constant import MIN_PARALLEL_SCALE
+from instrument import traced
+
+from MouseInteractorStyle import display_to_world
 
 
 class MouseInteractorStyle2(vtkInteractorStyleImage):
-    def __init__(self, select_callback, change_callback, *args, **kwargs):
+    def __init__(self, select_callback, change_callback, lattice=None, insert_callback=None, move_callback=None,
+                 contains_callback=None, stroke_callback=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.AddObserver('LeftButtonPressEvent', self.left_button_press_event)
-        # self.AddObserver('LeftButtonReleaseEvent', self.left_button_release_event)
+        self.AddObserver('LeftButtonReleaseEvent', self.left_button_release_event)
         self.AddObserver('RightButtonPressEvent', self.right_button_press_event)
-        # self.AddObserver('MouseMoveEvent', self.mouse_move_event)
+        self.AddObserver('MouseMoveEvent', self.mouse_move_event)
         self.AddObserver('MouseWheelForwardEvent', self.scroll_event)
         self.AddObserver('MouseWheelBackwardEvent', self.scroll_event)
         # self.AddObserver('KeyPressEvent', self.key_press_event)
         self.AddObserver('CharEvent', self.char_event)
         self.callback_select = select_callback
         self.callback_change = change_callback
-
+        self.callback_insert = insert_callback
+        self.callback_move = move_callback
+        self.callback_contains = contains_callback
+        # told when a vertex drag starts (True) and ends (False)
+        self.callback_stroke = stroke_callback
+        # polygon vertex being dragged, -1 when not dragging
+        self.drag_point_id = -1
+        # with a lattice, picks are resolved arithmetically instead of ray casting the grid
+        # farthest zoom as the parallel scale, VTKControl fits it to the grid
+        self.max_scale = 20
+        self.lattice = lattice
+        self.picker = vtkPointPicker()
+        self.picker.SetTolerance(0.01)
+
+    @traced
     def pick_point(self):
         # Get the location of the click (in window coordinates)
         pos = self.GetInteractor().GetEventPosition()
 
-        picker = vtkPointPicker()
-        picker.SetTolerance(0.01)
+        if self.lattice is not None:
+            ren = self.GetDefaultRenderer()
+            # same tolerance as the point picker: a fraction of the window diagonal
+            width, height = ren.GetRenderWindow().GetSize()
+            tolerance = self.picker.GetTolerance() * (width ** 2 + height ** 2) ** 0.5
+            x, y = display_to_world(ren, pos[0], pos[1])
+            tx, ty = display_to_world(ren, pos[0] + tolerance, pos[1])
+            point_id = int(self.lattice.locate_point(x, y, ((tx - x) ** 2 + (ty - y) ** 2) ** 0.5))
+            return point_id, None
 
         # Pick from this location.
-        picker.Pick(pos[0], pos[1], 0, self.GetDefaultRenderer())
+        self.picker.Pick(pos[0], pos[1], 0, self.GetDefaultRenderer())
 
-        return picker.GetPointId(), picker.GetActor()
+        return self.picker.GetPointId(), self.picker.GetActor()
 
+    @traced
     def scroll_event(self, obj, event):
         scale = self.GetDefaultRenderer().GetActiveCamera().GetParallelScale()
         if event == 'MouseWheelForwardEvent':
-            if scale < 2:
+            if scale < MIN_PARALLEL_SCALE:
                 return
             self.OnMouseWheelForward()
         elif event == 'MouseWheelBackwardEvent':
-            if scale > 20:
+            if scale > self.max_scale:
                 return
             self.OnMouseWheelBackward()
 
+    @traced
     def right_button_press_event(self, obj, event):
         if self.GetInteractor().GetShiftKey() or self.GetInteractor().GetControlKey():
             return
@@ -49,8 +77,14 @@ class MouseInteractorStyle2(vtkInteractorStyleImage):
 
         # self.OnRightButtonDown()
 
+    @traced
     def left_button_press_event(self, obj, event):
+        # shift+click puts the point on the nearest polygon edge
         if self.GetInteractor().GetShiftKey():
+            if self.callback_insert is not None:
+                point_id, actor = self.pick_point()
+                if point_id != -1:
+                    self.callback_insert(point_id)
             return
 
         remove_mode = False
@@ -62,10 +96,33 @@ class MouseInteractorStyle2(vtkInteractorStyleImage):
         point_id, actor = self.pick_point()
 
         if point_id != -1:
+            # pressing on a polygon vertex starts dragging it
+            if not remove_mode and self.callback_move is not None and self.callback_contains(point_id):
+                self.drag_point_id = point_id
+                if self.callback_stroke is not None:
+                    self.callback_stroke(True)
+                return
 
             self.callback_select(point_id, remove_mode)
         # Forward events
         # self.OnLeftButtonDown()
 
+    @traced
+    def left_button_release_event(self, obj, event):
+        if self.drag_point_id != -1 and self.callback_stroke is not None:
+            self.callback_stroke(False)
+        self.drag_point_id = -1
+
+    @traced
+    def mouse_move_event(self, obj, event):
+        if self.drag_point_id != -1:
+            point_id, actor = self.pick_point()
+            if point_id != -1 and point_id != self.drag_point_id:
+                # the drag follows only a move that happened, not one onto another vertex
+                if self.callback_move(self.drag_point_id, point_id) >= 0:
+                    self.drag_point_id = point_id
+
+        self.OnMouseMove()
+
     def char_event(self, obj, event):
         return
@@ -1,10 +1,22 @@
-from PyQt6 import (
+import time
+
+# startup timings, reported in the status bar once the first frame is drawn. STARTED is taken
+# before the other imports on purpose, they are part of what it measures.
+STARTED = time.perf_counter()
+
+from PyQt6 import (  # noqa: E402
     QtWidgets,
     QtCore,
     QtGui
 )
-from mainwindow import Ui_MainWindow
-from vtkcontrol import VTKControl
+from export import EXPORT_FORMATS, WRITE_PROGRESS, export_filters, format_from_filter  # noqa: E402
+from exportworker import ExportWorker  # noqa: E402
+from instrument import recorder  # noqa: E402
+from mainwindow import Ui_MainWindow  # noqa: E402
+from session import SESSION_EXTENSION  # noqa: E402
+from vtkcontrol import VTKControl  # noqa: E402
+
+IMPORTED = time.perf_counter()
 
 
 class MainView(QtWidgets.QMainWindow):
@@ -12,8 +24,18 @@ class MainView(QtWidgets.QMainWindow):
         QtWidgets.QMainWindow.__init__(self, parent)
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
-        self.vtk = VTKControl(self.ui.vtkWidget)
-        self.ui.actionSave.triggered.connect(self.open_save_dialog)
+        # the grid is built by start(), after the window is shown
+        self.vtk = VTKControl(self.ui.vtkWidget, deferred=True)
+        self.ui.menubar.setEnabled(False)
+        self.ui.actionSave.triggered.connect(lambda: self.open_save_dialog())
+        self.ui.actionSaveMerged.triggered.connect(lambda: self.open_save_dialog(True))
+        self.ui.actionUndo.triggered.connect(self.vtk.undo)
+        self.ui.actionRedo.triggered.connect(self.vtk.redo)
+        self.ui.actionOpenSession.triggered.connect(self.open_session_dialog)
+        self.ui.actionSaveSession.triggered.connect(self.save_session_dialog)
+        self.export_pool = QtCore.QThreadPool.globalInstance()
+        self.export_worker = None
+        self.export_progress = None
         # self.ren = vtkRenderer()
         # self.ui.vtkWidget.GetRenderWindow().AddRenderer(self.ren)
         # self.iren = self.ui.vtkWidget.GetRenderWindow().GetInteractor()
@@ -25,58 +47,225 @@ class MainView(QtWidgets.QMainWindow):
         self.ui.actionMesh.triggered.connect(self.check_changed_mesh)
         self.ui.actionNode.triggered.connect(self.check_changed_node)
 
+        self.ui.actionPaint.triggered.connect(lambda: self.check_changed_tool('paint'))
+        self.ui.actionBox.triggered.connect(lambda: self.check_changed_tool('box'))
+        self.ui.actionLasso.triggered.connect(lambda: self.check_changed_tool('lasso'))
+        self.ui.actionFill.triggered.connect(lambda: self.check_changed_tool('fill'))
+
+        self.ui.actionGrow.triggered.connect(self.vtk.grow_selection)
+        self.ui.actionShrink.triggered.connect(self.vtk.shrink_selection)
+        self.ui.actionInvert.triggered.connect(self.vtk.invert_selection)
+        self.ui.actionFillHoles.triggered.connect(self.vtk.fill_selection_holes)
+        self.ui.actionStoreSelection.triggered.connect(self.vtk.store_selection)
+        self.ui.actionUnion.triggered.connect(lambda: self.vtk.combine_stored_selection('union'))
+        self.ui.actionIntersect.triggered.connect(lambda: self.vtk.combine_stored_selection('intersection'))
+        self.ui.actionSubtract.triggered.connect(lambda: self.vtk.combine_stored_selection('difference'))
+
+        self.ui.addLayerButton.clicked.connect(self.add_layer)
+        self.ui.removeLayerButton.clicked.connect(self.remove_layer)
+        self.ui.layerList.currentRowChanged.connect(self.change_layer)
+        self.ui.layerList.itemChanged.connect(self.rename_layer)
+
         self.ui.actionMesh.setChecked(True)
         self.ui.actionQuad.setChecked(True)
+        self.ui.actionPaint.setChecked(True)
 
         self.ui.vtkWidget.setContextMenuPolicy(QtCore.Qt.ContextMenuPolicy.CustomContextMenu)
+
+    def start(self):
+        shown = time.perf_counter()
+        self.vtk.start()
+        self.update_layer_list()
+        self.ui.menubar.setEnabled(True)
         self.ui.vtkWidget.customContextMenuRequested.connect(self.open_context_menu)
+        ready = time.perf_counter()
+        self.ui.statusbar.showMessage('Started in %d ms (imports %d ms, window %d ms, grid %d ms)' % (
+            (ready - STARTED) * 1000, (IMPORTED - STARTED) * 1000, (shown - IMPORTED) * 1000, (ready - shown) * 1000),
+            10000)
+        if recorder.enabled:
+            for name, start, end in (('startup.imports', STARTED, IMPORTED), ('startup.window', IMPORTED, shown),
+                                     ('startup.grid', shown, ready)):
+                recorder.add(name, (start - recorder.origin) * 1e6, (end - start) * 1e6)
 
     def check_changed_quad(self):
         if self.ui.actionQuad.isChecked():
             self.ui.actionHexagon.setChecked(False)
-            self.vtk.init_view(0, 0 if self.ui.actionMesh.isChecked() else 1 if self.ui.actionNode.isChecked() else -1)
+            self.init_view(0, 0 if self.ui.actionMesh.isChecked() else 1 if self.ui.actionNode.isChecked() else -1)
         else:
             self.ui.actionQuad.setChecked(True)
 
     def check_changed_hexagon(self):
         if self.ui.actionHexagon.isChecked():
             self.ui.actionQuad.setChecked(False)
-            self.vtk.init_view(1, 0 if self.ui.actionMesh.isChecked() else 1 if self.ui.actionNode.isChecked() else -1)
+            self.init_view(1, 0 if self.ui.actionMesh.isChecked() else 1 if self.ui.actionNode.isChecked() else -1)
         else:
             self.ui.actionHexagon.setChecked(True)
 
     def check_changed_mesh(self):
         if self.ui.actionMesh.isChecked():
             self.ui.actionNode.setChecked(False)
-            self.vtk.init_view(0 if self.ui.actionQuad.isChecked() else 1 if self.ui.actionHexagon.isChecked() else -1, 0)
+            self.init_view(0 if self.ui.actionQuad.isChecked() else 1 if self.ui.actionHexagon.isChecked() else -1, 0)
         else:
             self.ui.actionMesh.setChecked(True)
 
     def check_changed_node(self):
         if self.ui.actionNode.isChecked():
             self.ui.actionMesh.setChecked(False)
-            self.vtk.init_view(0 if self.ui.actionQuad.isChecked() else 1 if self.ui.actionHexagon.isChecked() else -1, 1)
+            self.init_view(0 if self.ui.actionQuad.isChecked() else 1 if self.ui.actionHexagon.isChecked() else -1, 1)
         else:
             self.ui.actionNode.setChecked(True)
 
-    def open_save_dialog(self):
-        ret = self.vtk.check_save_possible()
-        if not ret:
+    def init_view(self, grid_type, interactor_style):
+        # a new grid or mode starts over with a single empty layer
+        self.vtk.init_view(grid_type, interactor_style)
+        self.update_layer_list()
+
+    def update_layer_list(self):
+        self.ui.layerList.blockSignals(True)
+        self.ui.layerList.clear()
+        for layer in self.vtk.layers:
+            icon = QtGui.QPixmap(12, 12)
+            icon.fill(QtGui.QColor.fromRgbF(*self.vtk.colors.GetColor3d(layer.color)))
+            item = QtWidgets.QListWidgetItem(QtGui.QIcon(icon), layer.name)
+            item.setFlags(item.flags() | QtCore.Qt.ItemFlag.ItemIsEditable)
+            self.ui.layerList.addItem(item)
+        self.ui.layerList.setCurrentRow(self.vtk.layers.index(self.vtk.layer))
+        self.ui.layerList.blockSignals(False)
+        self.ui.removeLayerButton.setEnabled(len(self.vtk.layers) > 1)
+
+    def add_layer(self):
+        self.vtk.add_layer()
+        self.update_layer_list()
+
+    def remove_layer(self):
+        if self.vtk.remove_layer(self.ui.layerList.currentRow()):
+            self.update_layer_list()
+
+    def change_layer(self, row):
+        if row >= 0:
+            self.vtk.set_active_layer(row)
+
+    def rename_layer(self, item):
+        name = item.text().strip()
+        row = self.ui.layerList.row(item)
+        name = self.vtk.rename_layer(row, name) if name else self.vtk.layers[row].name
+        if name != item.text():
+            self.ui.layerList.blockSignals(True)
+            item.setText(name)
+            self.ui.layerList.blockSignals(False)
+
+    def check_changed_tool(self, tool):
+        # box and lasso select every center inside the dragged region, fill the region around the
+        # clicked center; Ctrl removes them
+        self.ui.actionPaint.setChecked(tool == 'paint')
+        self.ui.actionBox.setChecked(tool == 'box')
+        self.ui.actionLasso.setChecked(tool == 'lasso')
+        self.ui.actionFill.setChecked(tool == 'fill')
+        self.vtk.set_selection_tool(tool)
+
+    def open_save_dialog(self, merged=False):
+        # the active layer, or every layer in one file with merged
+        if not self.vtk.check_save_possible(merged):
             QtWidgets.QMessageBox.critical(self, 'Error', 'Error: No meshes or nodes selected.')
-        path = QtWidgets.QFileDialog.getSaveFileName(
+            return
+        path, selected_filter = QtWidgets.QFileDialog.getSaveFileName(
             self,
             "Save File",
             "",
-            "PLY File (*.ply)",
+            export_filters(),
+        )
+        if path:
+            file_format = format_from_filter(selected_filter) or 'ply'
+            extension = EXPORT_FORMATS[file_format][1]
+            if not path.lower().endswith(extension):
+                path += extension
+            self.start_export(path, file_format, merged)
+
+    def start_export(self, path, file_format, merged=False):
+        if self.export_worker is not None:
+            QtWidgets.QMessageBox.critical(self, 'Error', 'Error: Another export is still running.')
+            return
+        # the worker exports a snapshot, so the selection can be edited while it runs
+        self.export_worker = ExportWorker(self.vtk.export_snapshot(merged), path, file_format)
+        self.export_progress = QtWidgets.QProgressDialog('Saving ' + path, 'Cancel', 0, 100, self)
+        self.export_progress.setWindowModality(QtCore.Qt.WindowModality.NonModal)
+        self.export_progress.setMinimumDuration(500)
+        self.export_progress.setAutoClose(False)
+        self.export_progress.canceled.connect(self.export_worker.cancel)
+        self.export_worker.signals.progress.connect(self.export_progressed)
+        self.export_worker.signals.finished.connect(self.export_finished)
+        self.export_worker.signals.failed.connect(self.export_failed)
+        self.export_worker.signals.cancelled.connect(self.export_cancelled)
+        self.export_pool.start(self.export_worker)
+
+    def export_progressed(self, percent):
+        self.export_progress.setValue(percent)
+        if percent >= WRITE_PROGRESS and self.export_progress.labelText().startswith('Saving'):
+            # the writers cannot be interrupted, cancelling is only possible while the mesh is built
+            self.export_progress.setLabelText('Writing %s, this cannot be cancelled' % self.export_worker.path)
+            self.export_progress.setCancelButton(None)
+
+    def end_export(self):
+        self.export_progress.canceled.disconnect()
+        self.export_progress.close()
+        self.export_progress = None
+        self.export_worker = None
+
+    def export_finished(self, path, ret):
+        self.end_export()
+        if ret != 1:
+            QtWidgets.QMessageBox.critical(self, 'Error', 'Error: Failed to save file.')
+        else:
+            self.ui.statusbar.showMessage('Saved ' + path, 5000)
+
+    def export_failed(self, path, message):
+        self.end_export()
+        QtWidgets.QMessageBox.critical(self, 'Error', 'Error: Failed to save file.\n' + message)
+
+    def export_cancelled(self, path):
+        self.end_export()
+
+    def open_session_dialog(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self,
+            "Open Session",
+            "",
+            "Session File (*%s)" % SESSION_EXTENSION,
         )
-        if path[0]:
-            ret = self.vtk.save_ply(path=path[0])
-            if ret != 1:
-                QtWidgets.QMessageBox.critical(self, 'Error', 'Error: Failed to save PLY file.')
+        if not path:
+            return
+        try:
+            self.vtk.load_session(path)
+        except (OSError, ValueError) as e:
+            QtWidgets.QMessageBox.critical(self, 'Error', 'Error: Failed to open session.\n' + str(e))
+        self.ui.actionQuad.setChecked(self.vtk.current_grid_type == 0)
+        self.ui.actionHexagon.setChecked(self.vtk.current_grid_type == 1)
+        self.ui.actionMesh.setChecked(self.vtk.current_interactor_style == 0)
+        self.ui.actionNode.setChecked(self.vtk.current_interactor_style == 1)
+        self.update_layer_list()
+
+    def save_session_dialog(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self,
+            "Save Session",
+            "",
+            "Session File (*%s)" % SESSION_EXTENSION,
+        )
+        if not path:
+            return
+        if not path.lower().endswith(SESSION_EXTENSION):
+            path += SESSION_EXTENSION
+        try:
+            self.vtk.save_session(path)
+        except OSError as e:
+            QtWidgets.QMessageBox.critical(self, 'Error', 'Error: Failed to save session.\n' + str(e))
 
     def select_menu_temp(self, point_id, shape):
         self.vtk.change_mesh(point_id, shape)
 
+    def select_menu_boundary(self, shape):
+        self.vtk.apply_shape(self.vtk.get_boundary_centers(), shape)
+
     def open_context_menu(self, point):
         point_id, num = self.vtk.get_number_context_menu()
         if num == 0:
@@ -87,6 +276,13 @@ class MainView(QtWidgets.QMainWindow):
             action = QtGui.QAction(action_menu, self.contextMenu)
             action.triggered.connect(lambda chk, pt=point_id, shape=i: self.select_menu_temp(pt, shape))
             self.contextMenu.addAction(action)
+        self.contextMenu.addSeparator()
+        boundary_menu = self.contextMenu.addMenu("All boundary points")
+        for i in range(num):
+            action_menu = "Menu " + str(i)
+            action = QtGui.QAction(action_menu, boundary_menu)
+            action.triggered.connect(lambda chk, shape=i: self.select_menu_boundary(shape))
+            boundary_menu.addAction(action)
         self.contextMenu.exec(self.ui.vtkWidget.mapToGlobal(point))
 
 
@@ -95,6 +291,8 @@ def main():
     app = QtWidgets.QApplication(sys.argv)
     main_window = MainView()
     main_window.show()
+    # builds the grid from the event loop, after the window is up
+    QtCore.QTimer.singleShot(0, main_window.start)
     # main_window.iren.Initialize()
     sys.exit(app.exec())
 
@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from Constant import GRID_SIZE
+from export import EXPORT_FORMATS
+from session import SESSION_EXTENSION, read_session
+
+DESCRIPTION = '''Generates meshes from selection specs without opening a window.
+
+A spec is a saved session (%s), a JSON object, a JSON list of objects, or an .npz file
+with the same keys:
+  grid_type   "quad" / "hexagon" (or 0 / 1), default quad
+  grid_size   lattice size, default %d
+  centers     center point ids to select (mesh mode)
+  shapes      one shape code for all centers or one per center, default 0
+  polygon     node point ids of the outline (node mode, used when there are no centers)
+  output      output file name, default the spec file name
+  format      one of %s, default from the output extension
+''' % (SESSION_EXTENSION, GRID_SIZE, ', '.join(EXPORT_FORMATS))
+
+GRID_TYPES = {'quad': 0, 'hexagon': 1}
+
+# one headless control per worker process, reused by all of its jobs
+control = None
+
+
+def get_control():
+    global control
+    if control is None:
+        from vtkcontrol import VTKControl
+        control = VTKControl()
+    return control
+
+
+def load_specs(path):
+    if path.endswith(SESSION_EXTENSION):
+        specs = [{'session': path}]
+    elif path.endswith('.npz'):
+        with np.load(path) as f:
+            specs = [{name: f[name] for name in f.files}]
+    else:
+        with open(path) as f:
+            specs = json.load(f)
+        if isinstance(specs, dict):
+            specs = [specs]
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    for i, spec in enumerate(specs):
+        if 'output' not in spec:
+            spec['output'] = stem + ('_%d' % i if len(specs) > 1 else '')
+    return specs
+
+
+def run_job(spec, output_dir, default_format):
+    file_format = spec.get('format', default_format)
+    file_format = str(file_format) if file_format is not None else None
+    path = os.path.join(output_dir, str(spec['output']))
+    if not os.path.splitext(path)[1]:
+        path += EXPORT_FORMATS[file_format or 'ply'][1]
+
+    if 'session' in spec:
+        # the saved selection is exported as it is
+        session = read_session(spec['session'])
+        lattice = get_control().grid_cache.get(session.grid_type, session.grid_size).lattice
+        session.check(lattice)
+        ret = session.snapshot(lattice).run(path, file_format)
+        if ret != 1:
+            raise RuntimeError('writer failed')
+        return path
+
+    grid_type = spec.get('grid_type', 0)
+    grid_type = int(GRID_TYPES.get(str(grid_type), grid_type))
+    centers = np.asarray(spec.get('centers', []), dtype=np.int64)
+    polygon = np.asarray(spec.get('polygon', []), dtype=np.int64)
+
+    vtk = get_control()
+    vtk.grid_size = int(spec.get('grid_size', GRID_SIZE))
+    if centers.size:
+        vtk.init_view(grid_type, 0)
+        if centers.min() < vtk.lattice.num_nodes or centers.max() >= vtk.lattice.points.shape[0]:
+            raise ValueError('centers are not center point ids of this grid')
+        vtk.select_centers(centers)
+        vtk.apply_shape(centers, np.asarray(spec.get('shapes', 0), dtype=np.int64))
+    else:
+        vtk.init_view(grid_type, 1)
+        if polygon.size and (polygon.min() < 0 or polygon.max() >= vtk.lattice.points.shape[0]):
+            raise ValueError('polygon has point ids outside of this grid')
+        vtk.set_node_polygon(polygon)
+
+    ret = vtk.save_mesh(path, file_format)
+    if ret != 1:
+        raise RuntimeError('nothing selected' if ret == -1 else 'writer failed')
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=DESCRIPTION, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('specs', nargs='+', help='JSON or NPZ spec files')
+    parser.add_argument('-o', '--output-dir', default='.', help='where the meshes are written')
+    parser.add_argument('-f', '--format', choices=list(EXPORT_FORMATS), help='format of specs without one')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='number of worker processes')
+    args = parser.parse_args(argv)
+
+    specs = []
+    for path in args.specs:
+        specs.extend(load_specs(path))
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {executor.submit(run_job, spec, args.output_dir, args.format): spec for spec in specs}
+        for future in as_completed(futures):
+            try:
+                print(future.result())
+            except Exception as e:
+                failed += 1
+                print('%s: %s' % (futures[future]['output'], e), file=sys.stderr)
+
+    print('%d of %d meshes written' % (len(specs) - failed, len(specs)))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
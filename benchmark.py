@@ -0,0 +1,173 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from vtkmodules.vtkCommonCore import vtkVersion
+
+from gridcache import GridCache
+
+try:
+    import resource
+except ImportError:
+    resource = None  # not available on Windows, max_rss_kb is left out there
+
+
+class OffscreenView:
+    # stands in for the Qt widget: an offscreen render window with its interactor
+    def __init__(self):
+        import vtkmodules.vtkRenderingOpenGL2
+        from vtkmodules.vtkRenderingCore import vtkRenderWindow, vtkRenderWindowInteractor
+        self.ren_win = vtkRenderWindow()
+        self.ren_win.SetOffScreenRendering(1)
+        self.ren_win.SetSize(800, 600)
+        self.iren = vtkRenderWindowInteractor()
+        self.iren.SetRenderWindow(self.ren_win)
+
+    def GetRenderWindow(self):
+        return self.ren_win
+
+
+class Benchmark:
+    def __init__(self, headless=False, trace_memory=True, seed=0):
+        from vtkcontrol import VTKControl
+        # exported files and the grid disk cache go to a directory removed by close(), the grid
+        # cache of the user is neither read nor filled
+        self.temp_dir = tempfile.TemporaryDirectory(prefix='draw-poly-bench-')
+        self.output_dir = self.temp_dir.name
+        self.vtk = VTKControl(None if headless else OffscreenView(), deferred=True)
+        self.vtk.grid_cache = self.warm_cache()
+        self.vtk.start()
+        self.trace_memory = trace_memory
+        self.rng = np.random.default_rng(seed)
+        self.results = []
+
+    def close(self):
+        self.temp_dir.cleanup()
+
+    def warm_cache(self):
+        return GridCache(cache_dir=os.path.join(self.output_dir, 'grids'))
+
+    def measure(self, name, params, function, calls=1, warmup=False):
+        # Times `calls` calls of function, after one untimed call for repeatable functions with
+        # warmup. Memory is the traced Python/numpy peak of the calls unless turned off, and the
+        # process peak RSS, which never goes down and so only shows the largest case so far.
+        if warmup:
+            function()
+        gc.collect()
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        seconds = time.perf_counter() - start
+        result = dict(name=name, seconds=seconds, calls=calls, seconds_per_call=seconds / calls, **params)
+        if self.trace_memory:
+            result['peak_traced_bytes'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        if resource is not None:
+            result['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self.results.append(result)
+        print('%-30s %-40s %10.3f ms' % (name, json.dumps(params), seconds * 1000), file=sys.stderr)
+        return result
+
+    def view(self, grid_type, interactor_style, grid_size):
+        self.vtk.grid_size = grid_size
+        self.vtk.init_view(grid_type, interactor_style)
+        return self.vtk.lattice
+
+    def random_centers(self, lattice, count):
+        count = min(count, lattice.num_centers)
+        return self.rng.choice(lattice.num_centers, count, replace=False) + lattice.num_nodes
+
+    def grid_build(self, grid_size):
+        # cold builds: no in-memory or disk cache
+        for grid_type, name in ((0, 'init_quad_grid'), (1, 'init_hexagon_grid')):
+            self.vtk.grid_cache = GridCache(cache_dir=None)
+            self.measure(name, dict(grid_size=grid_size), lambda: self.view(grid_type, 0, grid_size))
+        self.vtk.grid_cache = self.warm_cache()
+
+    def mesh_editing(self, grid_type, grid_size, selection_size):
+        params = dict(grid_type=grid_type, grid_size=grid_size, selection_size=selection_size)
+        lattice = self.view(grid_type, 0, grid_size)
+        centers = iter(self.random_centers(lattice, selection_size).tolist())
+        count = min(selection_size, lattice.num_centers)
+        self.measure('select_mesh_callback', params, lambda: self.vtk.select_mesh_callback(next(centers), False),
+                     count)
+
+        selected = iter((np.flatnonzero(self.vtk.center_shapes >= 0) + lattice.num_nodes).tolist())
+        shapes = len(self.vtk.shape_table)
+        self.measure('change_mesh', params,
+                     lambda: self.vtk.change_mesh(next(selected), int(self.rng.integers(shapes))), count)
+
+        self.measure('regenerate_unstructured_grid', params, self.vtk.regenerate_unstructured_grid, warmup=True)
+        path = os.path.join(self.output_dir, 'mesh.ply')
+        self.measure('save_ply_mesh', params, lambda: self.vtk.save_ply(path), warmup=True)
+
+    def node_editing(self, grid_type, grid_size, polygon_size):
+        params = dict(grid_type=grid_type, grid_size=grid_size, selection_size=polygon_size)
+        lattice = self.view(grid_type, 1, grid_size)
+        # a polygon around the middle of the grid, one vertex per node picked on a circle
+        angles = np.linspace(0, 2 * np.pi, polygon_size, endpoint=False)
+        extent = lattice.points[:, :2].max(axis=0)
+        x = extent[0] * (0.5 + 0.4 * np.cos(angles))
+        y = extent[1] * (0.5 + 0.4 * np.sin(angles))
+        nodes = lattice.locate_point(x, y, np.inf)
+        nodes = nodes[nodes < lattice.num_nodes].tolist()
+        vertices = iter(nodes)
+        self.measure('select_point_callback', params,
+                     lambda: self.vtk.select_point_callback(next(vertices), False), len(nodes))
+
+        path = os.path.join(self.output_dir, 'node.ply')
+        self.measure('save_ply_node', params, lambda: self.vtk.save_ply(path), warmup=True)
+
+    def run(self, grid_sizes, selection_sizes):
+        for grid_size in grid_sizes:
+            self.grid_build(grid_size)
+            for selection_size in selection_sizes:
+                for grid_type in (0, 1):
+                    self.mesh_editing(grid_type, grid_size, selection_size)
+                    self.node_editing(grid_type, grid_size, min(selection_size, 4 * grid_size))
+        return self.results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Times grid building, editing and export offscreen.')
+    parser.add_argument('-g', '--grid-sizes', default='50,100,200', help='comma separated GRID_SIZE values')
+    parser.add_argument('-s', '--selection-sizes', default='100,1000', help='comma separated selection sizes')
+    parser.add_argument('-o', '--output', help='JSON result file, stdout by default')
+    parser.add_argument('--headless', action='store_true', help='skip rendering, for machines without OpenGL')
+    parser.add_argument('--no-trace-memory', dest='trace_memory', action='store_false',
+                        help='skip the traced Python/numpy peak of every benchmark, which slows Python code down')
+    args = parser.parse_args(argv)
+
+    benchmark = Benchmark(args.headless, args.trace_memory)
+    try:
+        results = benchmark.run([int(s) for s in args.grid_sizes.split(',')],
+                                [int(s) for s in args.selection_sizes.split(',')])
+    finally:
+        benchmark.close()
+    report = dict(
+        python=platform.python_version(),
+        numpy=np.__version__,
+        vtk=vtkVersion.GetVTKVersion(),
+        machine=platform.machine(),
+        headless=args.headless,
+        results=results,
+    )
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        print()
+
+
+if __name__ == '__main__':
+    main()
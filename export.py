@@ -0,0 +1,197 @@
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from meshing import mesh_to_polydata, merge_meshes, regenerate_mesh, regenerate_merged_mesh, fill_polygon_nodes
+from shapes import merge_kept_cells
+
+# The VTK writers are imported by the functions using them: loading the IO and filter modules
+# takes longer than everything else the application imports, and they are only needed on save.
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+# progress of ExportSnapshot.run once the mesh is built. Writing the file is one step that can be
+# neither followed nor cancelled: the VTK writers report only its start and end.
+WRITE_PROGRESS = 50
+
+
+def write_ply(path, poly_data, file_type='binary', byte_order='little'):
+    from vtkmodules.vtkIOPLY import vtkPLYWriter
+    writer = vtkPLYWriter()
+    writer.SetFileName(path)
+    writer.SetInputData(poly_data)
+    if file_type == 'ascii':
+        writer.SetFileTypeToASCII()
+    else:
+        writer.SetFileTypeToBinary()
+        if byte_order == 'big':
+            writer.SetDataByteOrderToBigEndian()
+        else:
+            writer.SetDataByteOrderToLittleEndian()
+    return writer.Write()
+
+
+def write_vtp(path, poly_data):
+    from vtkmodules.vtkIOXML import vtkXMLPolyDataWriter
+    writer = vtkXMLPolyDataWriter()
+    writer.SetFileName(path)
+    writer.SetInputData(poly_data)
+    writer.SetDataModeToAppended()
+    writer.EncodeAppendedDataOff()
+    return writer.Write()
+
+
+def write_stl(path, poly_data):
+    from vtkmodules.vtkFiltersCore import vtkTriangleFilter
+    from vtkmodules.vtkIOGeometry import vtkSTLWriter
+    # STL only knows triangles, the quads of a quad mesh are split first
+    triangle_filter = vtkTriangleFilter()
+    triangle_filter.SetInputData(poly_data)
+    writer = vtkSTLWriter()
+    writer.SetFileName(path)
+    writer.SetInputConnection(triangle_filter.GetOutputPort())
+    writer.SetFileTypeToBinary()
+    return writer.Write()
+
+
+def write_obj(path, poly_data):
+    from vtkmodules.vtkIOGeometry import vtkOBJWriter
+    writer = vtkOBJWriter()
+    writer.SetFileName(path)
+    writer.SetInputData(poly_data)
+    return writer.Write()
+
+
+def write_npz(path, points, offsets, connectivity):
+    # The raw buffers: polygon i is points[connectivity[offsets[i]:offsets[i + 1]]]
+    with open(path, 'wb') as f:
+        np.savez(f, points=points, offsets=offsets, connectivity=connectivity)
+    return 1
+
+
+# name: (file dialog filter, file extension, writer taking (path, vtkPolyData))
+EXPORT_FORMATS = OrderedDict((
+    ('ply', ('PLY File (*.ply)', '.ply', write_ply)),
+    ('ply_big_endian', ('PLY File, big endian (*.ply)', '.ply',
+                        lambda path, poly_data: write_ply(path, poly_data, byte_order='big'))),
+    ('ply_ascii', ('PLY File, ASCII (*.ply)', '.ply',
+                   lambda path, poly_data: write_ply(path, poly_data, file_type='ascii'))),
+    ('vtp', ('VTK PolyData File (*.vtp)', '.vtp', write_vtp)),
+    ('stl', ('STL File (*.stl)', '.stl', write_stl)),
+    ('obj', ('OBJ File (*.obj)', '.obj', write_obj)),
+    ('npz', ('NumPy Buffers (*.npz)', '.npz', None)),
+))
+
+
+def export_filters():
+    return ';;'.join(file_filter for file_filter, _, _ in EXPORT_FORMATS.values())
+
+
+def format_from_filter(file_filter):
+    for name, (format_filter, _, _) in EXPORT_FORMATS.items():
+        if format_filter == file_filter:
+            return name
+    return None
+
+
+def format_from_path(path):
+    extension = os.path.splitext(path)[1].lower()
+    for name, (_, format_extension, _) in EXPORT_FORMATS.items():
+        if format_extension == extension:
+            return name
+    return 'ply'
+
+
+def write_mesh(path, points, offsets, connectivity, file_format=None):
+    # Writes the polygons in one of EXPORT_FORMATS, chosen by the file extension by default.
+    # Returns 1 on success like the VTK writers.
+    if file_format is None:
+        file_format = format_from_path(path)
+    if file_format == 'npz':
+        return write_npz(path, points, offsets, connectivity)
+    writer = EXPORT_FORMATS[file_format][2]
+    return writer(path, mesh_to_polydata(points, offsets, connectivity))
+
+
+class ExportSnapshot:
+    # A copy of the selection taken when an export starts. It shares only the lattice, which
+    # is never modified, so it can be exported on a worker thread while editing goes on.
+    def __init__(self, lattice, grid_type, interactor_style, center_shapes, polygon_ids):
+        self.lattice = lattice
+        self.grid_type = grid_type
+        self.interactor_style = interactor_style
+        self.center_shapes = np.array(center_shapes, dtype=np.int8)
+        self.polygon_ids = np.array(polygon_ids, dtype=np.int64)
+
+    def is_empty(self):
+        # no selected center, or a node polygon that fills no lattice triangle
+        if self.interactor_style == 0:
+            return not (self.center_shapes >= 0).any()
+        return len(self.polygon_ids) < 3 or fill_polygon_nodes(self.lattice, self.polygon_ids)[1].size < 2
+
+    def build_mesh(self, progress=None):
+        # progress(fraction) as in regenerate_mesh, a node polygon is filled in one step
+        if self.interactor_style == 0:
+            return regenerate_mesh(self.lattice, self.grid_type, self.center_shapes, progress)
+        return fill_polygon_nodes(self.lattice, self.polygon_ids)
+
+    def run(self, path, file_format=None, progress=None, cancelled=None):
+        # progress(percent) follows building the mesh up to WRITE_PROGRESS, then the file is written
+        # in one step. ExportCancelled is raised at the first progress report after cancelled()
+        # returns true, and once more before the written file replaces path. The file is written to
+        # a temporary file first, so a cancelled or failed export never touches an existing file.
+        def step(percent):
+            if cancelled is not None and cancelled():
+                raise ExportCancelled(path)
+            if progress is not None:
+                progress(percent)
+
+        if file_format is None:
+            file_format = format_from_path(path)
+        step(0)
+        mesh = self.build_mesh(lambda fraction: step(int(fraction * WRITE_PROGRESS)))
+        if mesh[1].size < 2:
+            return -1  # nothing to write, like VTKControl.save_mesh without a selection
+        step(WRITE_PROGRESS)
+        # ends in the extension of the format, the PLY writer appends it otherwise
+        tmp_path = '%s.%d.tmp%s' % (path, os.getpid(), EXPORT_FORMATS[file_format][1])
+        try:
+            ret = write_mesh(tmp_path, *mesh, file_format=file_format)
+            step(100)
+            if ret == 1:
+                os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return ret
+
+
+class MergedSnapshot(ExportSnapshot):
+    # The snapshots of several selection layers, exported together as one mesh. In mesh mode the
+    # cells kept by every layer are merged first, so a center selected in several layers is
+    # exported once with no cell that none of them keeps. In node mode the lattice triangles
+    # filled by more than one polygon are kept once.
+    def __init__(self, snapshots):
+        self.snapshots = snapshots
+        self.lattice = snapshots[0].lattice
+        self.grid_type = snapshots[0].grid_type
+        self.interactor_style = snapshots[0].interactor_style
+
+    def is_empty(self):
+        return all(snapshot.is_empty() for snapshot in self.snapshots)
+
+    def build_mesh(self, progress=None):
+        if self.interactor_style == 0:
+            kept_cells = merge_kept_cells(self.grid_type, self.lattice.fan_size,
+                                          [snapshot.center_shapes for snapshot in self.snapshots])
+            return regenerate_merged_mesh(self.lattice, self.grid_type, kept_cells, progress)
+        meshes = []
+        for snapshot in self.snapshots:
+            meshes.append(snapshot.build_mesh())
+            if progress is not None:
+                progress(len(meshes) / len(self.snapshots))
+        return merge_meshes(self.lattice, meshes)
@@ -0,0 +1,40 @@
+import threading
+
+from PyQt6 import QtCore
+
+from export import ExportCancelled
+
+
+class ExportSignals(QtCore.QObject):
+    progress = QtCore.pyqtSignal(int)
+    # path, writer result
+    finished = QtCore.pyqtSignal(str, int)
+    # path, error message
+    failed = QtCore.pyqtSignal(str, str)
+    cancelled = QtCore.pyqtSignal(str)
+
+
+class ExportWorker(QtCore.QRunnable):
+    # Runs an export.ExportSnapshot on a thread pool. The signals are delivered on the GUI thread.
+    def __init__(self, snapshot, path, file_format=None):
+        QtCore.QRunnable.__init__(self)
+        self.setAutoDelete(False)
+        self.snapshot = snapshot
+        self.path = path
+        self.file_format = file_format
+        self.signals = ExportSignals()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            ret = self.snapshot.run(self.path, self.file_format, self.signals.progress.emit,
+                                    self.cancel_event.is_set)
+        except ExportCancelled:
+            self.signals.cancelled.emit(self.path)
+        except Exception as e:
+            self.signals.failed.emit(self.path, str(e))
+        else:
+            self.signals.finished.emit(self.path, ret)
@@ -0,0 +1,87 @@
+import glob
+import os
+from collections import OrderedDict
+
+from Constant import GRID_CACHE_SIZE, GRID_CACHE_DIR, GRID_CACHE_FILES
+from lattice import QuadLattice, HexagonLattice
+
+# bump whenever the lattice layout or the saved arrays change
+CACHE_VERSION = 4
+
+LATTICE_TYPES = {
+    0: ('quad', QuadLattice),
+    1: ('hexagon', HexagonLattice),
+}
+
+
+class GridEntry:
+    def __init__(self, lattice):
+        self.lattice = lattice
+        # the triangles to select and pick, and the lines to draw over them, on the same points
+        points = lattice.make_points()
+        self.poly_data = lattice.to_polydata(points)
+        self.line_data = lattice.lines_to_polydata(points)
+
+
+class GridCache:
+    def __init__(self, max_entries=GRID_CACHE_SIZE, cache_dir=GRID_CACHE_DIR, max_files=GRID_CACHE_FILES):
+        self.max_entries = max_entries
+        self.max_files = max_files
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+
+    def get(self, grid_type, grid_size):
+        key = (grid_type, grid_size)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry
+
+        entry = GridEntry(self.load_lattice(grid_type, grid_size))
+        self.entries[key] = entry
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def cache_path(self, grid_type, grid_size):
+        name = LATTICE_TYPES[grid_type][0]
+        return os.path.join(self.cache_dir, '%s_%d_v%d.npz' % (name, grid_size, CACHE_VERSION))
+
+    def load_lattice(self, grid_type, grid_size):
+        lattice_class = LATTICE_TYPES[grid_type][1]
+        if self.cache_dir is None:
+            return lattice_class(grid_size)
+
+        path = self.cache_path(grid_type, grid_size)
+        if os.path.exists(path):
+            try:
+                lattice = lattice_class.load(path)
+                # the modification time orders the files for prune()
+                os.utime(path)
+                return lattice
+            except (OSError, ValueError, KeyError):
+                pass  # unreadable or stale cache file, rebuild it below
+
+        lattice = lattice_class(grid_size)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write to a temporary file first so a crash never leaves half a cache file behind
+            tmp_path = path + '.%d.tmp' % os.getpid()
+            lattice.save(tmp_path)
+            os.replace(tmp_path, path)
+            self.prune()
+        except OSError:
+            pass  # the disk cache is only an optimization
+        return lattice
+
+    def prune(self):
+        # deletes the files of other cache versions, then the least recently used ones beyond max_files
+        files = []
+        for path in glob.glob(os.path.join(self.cache_dir, '*_*_v*.npz')):
+            if path.endswith('_v%d.npz' % CACHE_VERSION):
+                files.append((os.path.getmtime(path), path))
+            else:
+                os.remove(path)
+        files.sort(reverse=True)
+        for _, path in files[self.max_files:]:
+            os.remove(path)
@@ -0,0 +1,218 @@
+import math
+
+import numpy as np
+from vtkmodules.util.numpy_support import numpy_to_vtk
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkImageData, vtkPolyData
+from vtkmodules.vtkFiltersSources import vtkPlaneSource
+from vtkmodules.vtkRenderingCore import vtkActor, vtkPolyDataMapper, vtkTexture
+
+from Constant import LOD_PIXELS, TILE_SIZE, MAX_TEXTURE_SIZE
+from lattice import make_cell_array
+
+# Level of detail display of a lattice. Zoomed out, where a lattice unit is only a few pixels,
+# the grid is one textured plane with a texel per center. Zoomed in, it is split into square
+# tiles of TILE_SIZE units that are built the first time they come into view, and only the
+# tiles in view are drawn. Both are brought up to date with the selection when they are drawn.
+
+
+def make_grid_actor(poly_data, lookup_table):
+    # Selected cells are colored through the lookup table, so a selection change only
+    # touches the 'Selected' array instead of extracting the selected cells again
+    mapper = vtkPolyDataMapper()
+    mapper.SetInputData(poly_data)
+    mapper.SetScalarModeToUseCellFieldData()
+    mapper.SelectColorArray('Selected')
+    mapper.SetColorModeToMapScalars()
+    mapper.SetLookupTable(lookup_table)
+    mapper.UseLookupTableScalarRangeOn()
+    mapper.ScalarVisibilityOn()
+
+    actor = vtkActor()
+    actor.SetMapper(mapper)
+    actor.GetProperty().SetLineWidth(3)
+    return actor
+
+
+def make_line_actor(poly_data, lookup_table):
+    # the lattice lines never change, they keep the grid color and are left out of picking
+    mapper = vtkPolyDataMapper()
+    mapper.SetInputData(poly_data)
+    mapper.ScalarVisibilityOff()
+
+    actor = vtkActor()
+    actor.SetMapper(mapper)
+    color = lookup_table.GetTableValue(0)
+    actor.GetProperty().SetColor(color[:3])
+    actor.GetProperty().SetOpacity(color[3])
+    actor.GetProperty().SetLineWidth(3)
+    actor.PickableOff()
+    return actor
+
+
+class GridTile:
+    # the triangles of some centers and some lattice line segments, with their own points
+    def __init__(self, lattice, centers, lines, lookup_table):
+        fan = lattice.fan_size
+        index = (centers[:, None] * fan + np.arange(fan)).reshape(-1)
+        triangles = lattice.triangles[index]
+
+        used, local = np.unique(np.concatenate((triangles.reshape(-1), lines.reshape(-1))), return_inverse=True)
+        local = local.reshape(-1).astype(np.int64)
+        points = vtkPoints()
+        points.SetData(numpy_to_vtk(lattice.points[used], deep=1))
+        self.poly_data = vtkPolyData()
+        self.poly_data.SetPoints(points)
+        self.poly_data.SetPolys(make_cell_array(np.arange(0, triangles.size + 1, 3, dtype=np.int64),
+                                                local[:triangles.size]))
+        self.poly_data.SetLines(make_cell_array(np.arange(0, lines.size + 1, 2, dtype=np.int64),
+                                                local[triangles.size:]))
+
+        # cell ids of the triangles in the full grid, the lines are never selected
+        self.cells = index
+        self.num_lines = lines.shape[0]
+        self.selected = np.zeros(self.num_lines + index.size, dtype=np.uint8)
+        self.selected_array = numpy_to_vtk(self.selected)
+        self.selected_array.SetName('Selected')
+        self.poly_data.GetCellData().AddArray(self.selected_array)
+        self.actor = make_grid_actor(self.poly_data, lookup_table)
+        self.version = -1
+
+    def refresh(self, cell_mask, version):
+        if self.version != version:
+            self.selected[self.num_lines:] = cell_mask[self.cells]
+            self.selected_array.Modified()
+            self.version = version
+
+
+class GridTexture:
+    # the whole grid as a plane with one texel per center, colored by whether it is selected
+    def __init__(self, lattice, lookup_table):
+        sx, sy = lattice.texel_size
+        centers = lattice.points[lattice.num_nodes:, :2]
+        # the epsilon keeps centers lying on a texel border inside, despite float32 coordinates
+        tx = np.floor(centers[:, 0] / sx + 1e-3).astype(np.int64)
+        ty = np.floor(centers[:, 1] / sy + 1e-3).astype(np.int64)
+        # large grids share a texel between factor x factor centers
+        factor = max(1, math.ceil((max(tx.max(), ty.max()) + 1) / MAX_TEXTURE_SIZE))
+        tx //= factor
+        ty //= factor
+        width = int(tx.max()) + 1
+        height = int(ty.max()) + 1
+        self.texels = ty * width + tx
+        self.lookup_table = lookup_table
+        self.pixels = np.empty((width * height, 4), dtype=np.uint8)
+        self.version = -1
+
+        image = vtkImageData()
+        image.SetDimensions(width, height, 1)
+        self.pixel_array = numpy_to_vtk(self.pixels)
+        image.GetPointData().SetScalars(self.pixel_array)
+        texture = vtkTexture()
+        texture.SetInputData(image)
+        texture.InterpolateOff()
+
+        plane = vtkPlaneSource()
+        plane.SetOrigin(0, 0, 0)
+        plane.SetPoint1(width * factor * sx, 0, 0)
+        plane.SetPoint2(0, height * factor * sy, 0)
+        mapper = vtkPolyDataMapper()
+        mapper.SetInputConnection(plane.GetOutputPort())
+        self.actor = vtkActor()
+        self.actor.SetMapper(mapper)
+        self.actor.SetTexture(texture)
+
+    def refresh(self, center_shapes, version):
+        if self.version != version:
+            # the selection color changes with the active layer
+            colors = np.rint(np.array([self.lookup_table.GetTableValue(i) for i in (0, 1)]) * 255).astype(np.uint8)
+            selected = np.zeros(self.pixels.shape[0], dtype=np.intp)
+            selected[self.texels[center_shapes >= 0]] = 1
+            self.pixels[:] = colors[selected]
+            self.pixel_array.Modified()
+            self.version = version
+
+
+class GridView:
+    def __init__(self, lattice, lookup_table):
+        self.lattice = lattice
+        self.lookup_table = lookup_table
+        self.renderer = None
+        # bumped on every selection change, tiles and texture compare it with their own
+        self.version = 0
+        self.texture = GridTexture(lattice, lookup_table)
+
+        # the segments of the lattice polylines, as the position of their first point in line_connectivity
+        starts = np.zeros(lattice.line_connectivity.size, dtype=bool)
+        starts[lattice.line_offsets[:-1]] = True
+        self.segments = np.flatnonzero(~starts[1:])
+
+        # centers and segments (by their first point) sorted by tile, tile (x, y) is y * tiles_x + x
+        extent = lattice.points[:, :2].max(axis=0)
+        self.tiles_x = int(extent[0] // TILE_SIZE) + 1
+        self.tiles_y = int(extent[1] // TILE_SIZE) + 1
+        tiles = np.minimum(np.floor(lattice.points[:, :2] / TILE_SIZE).astype(np.int64),
+                           (self.tiles_x - 1, self.tiles_y - 1))
+        point_tiles = tiles[:, 1] * self.tiles_x + tiles[:, 0]
+        self.center_order, self.center_offsets = self.sort_by_tile(point_tiles[lattice.num_nodes:])
+        self.segment_order, self.segment_offsets = self.sort_by_tile(
+            point_tiles[lattice.line_connectivity[self.segments]])
+        self.tiles = {}
+        self.visible = set()
+
+    def sort_by_tile(self, key):
+        order = np.argsort(key, kind='stable')
+        return order, np.searchsorted(key[order], np.arange(self.tiles_x * self.tiles_y + 1))
+
+    def add_to(self, renderer):
+        # the texture is visible until the first render, so the camera can be fitted to it
+        self.renderer = renderer
+        renderer.AddActor(self.texture.actor)
+
+    def modified(self):
+        self.version += 1
+
+    def update(self, cell_mask, center_shapes):
+        # picks the level of detail for the camera, right before the renderer draws
+        width, height = self.renderer.GetSize()
+        if height == 0:
+            return
+        camera = self.renderer.GetActiveCamera()
+        scale = camera.GetParallelScale()
+        if height / (2 * scale) < LOD_PIXELS:
+            self.texture.refresh(center_shapes, self.version)
+            self.texture.actor.VisibilityOn()
+            self.show_tiles(set(), cell_mask)
+            return
+
+        self.texture.actor.VisibilityOff()
+        # tiles overlapping the view, with a unit of margin for the cells and lines reaching out of them
+        x, y = camera.GetFocalPoint()[:2]
+        half_width = scale * width / height + 1
+        half_height = scale + 1
+        x0, x1 = (np.clip(np.floor(np.array([x - half_width, x + half_width]) / TILE_SIZE), 0, self.tiles_x - 1)
+                  .astype(int))
+        y0, y1 = (np.clip(np.floor(np.array([y - half_height, y + half_height]) / TILE_SIZE), 0, self.tiles_y - 1)
+                  .astype(int))
+        self.show_tiles({ty * self.tiles_x + tx for ty in range(y0, y1 + 1) for tx in range(x0, x1 + 1)},
+                        cell_mask)
+
+    def show_tiles(self, keys, cell_mask):
+        for key in self.visible - keys:
+            self.tiles[key].actor.VisibilityOff()
+        visible = set()
+        for key in keys:
+            tile = self.tiles.get(key)
+            if tile is None:
+                centers = self.center_order[self.center_offsets[key]:self.center_offsets[key + 1]]
+                segments = self.segments[self.segment_order[self.segment_offsets[key]:self.segment_offsets[key + 1]]]
+                if centers.size == 0 and segments.size == 0:
+                    continue
+                connectivity = self.lattice.line_connectivity
+                lines = np.stack((connectivity[segments], connectivity[segments + 1]), axis=1)
+                tile = self.tiles[key] = GridTile(self.lattice, centers, lines, self.lookup_table)
+                self.renderer.AddActor(tile.actor)
+            tile.refresh(cell_mask, self.version)
+            tile.actor.VisibilityOn()
+            visible.add(key)
+        self.visible = visible
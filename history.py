@@ -0,0 +1,166 @@
+import numpy as np
+
+from Constant import HISTORY_LIMIT
+
+# Undo/redo log of selection edits. Every entry only holds what the edit changed, so undo and redo
+# cost as much as the edit itself. Entries are applied through the VTKControl they came from:
+# set_center_shapes() for shape codes and node_polygon / node_polygon_modified() for the polygon.
+
+
+class ShapeDelta:
+    # center indices with their shape codes before and after the edit (-1 is unselected)
+    def __init__(self, index, before, after):
+        self.chunks = [(index, before, after)]
+
+    def compact(self):
+        # the first before and the last after of every center touched by the merged edits
+        if len(self.chunks) > 1:
+            index, before, after = (np.concatenate(arrays) for arrays in zip(*self.chunks))
+            first = np.unique(index, return_index=True)[1]
+            last = index.size - 1 - np.unique(index[::-1], return_index=True)[1]
+            self.chunks = [(index[first], before[first], after[last])]
+        return self.chunks[0]
+
+    def undo(self, control):
+        index, before, after = self.compact()
+        control.set_center_shapes(index, before)
+
+    def redo(self, control):
+        index, before, after = self.compact()
+        control.set_center_shapes(index, after)
+
+    def merge(self, other):
+        # a drag stroke keeps collecting into one delta, compacted when it is first used
+        if not isinstance(other, ShapeDelta):
+            return None
+        self.chunks.extend(other.chunks)
+        return self
+
+
+class PolygonEdit:
+    # one vertex of the node polygon inserted, removed or moved from point_id to new_point_id
+    def __init__(self, operation, position, point_id, new_point_id=-1):
+        self.operation = operation
+        self.position = position
+        self.point_id = point_id
+        self.new_point_id = new_point_id
+
+    def undo(self, control):
+        polygon = control.node_polygon
+        if self.operation == 'insert':
+            polygon.remove(self.point_id)
+        elif self.operation == 'remove':
+            polygon.insert(self.position, self.point_id)
+        else:
+            polygon.move(self.new_point_id, self.point_id)
+        control.node_polygon_modified()
+
+    def redo(self, control):
+        polygon = control.node_polygon
+        if self.operation == 'insert':
+            polygon.insert(self.position, self.point_id)
+        elif self.operation == 'remove':
+            polygon.remove(self.point_id)
+        else:
+            polygon.move(self.point_id, self.new_point_id)
+        control.node_polygon_modified()
+
+    def merge(self, other):
+        # dragging a vertex around is a single move
+        if (self.operation == 'move' and isinstance(other, PolygonEdit) and other.operation == 'move'
+                and other.point_id == self.new_point_id):
+            return PolygonEdit('move', self.position, self.point_id, other.new_point_id)
+        return None
+
+
+class PolygonReplace:
+    # the whole polygon replaced at once
+    def __init__(self, before, after):
+        self.before = before
+        self.after = after
+
+    def undo(self, control):
+        control.node_polygon.assign(self.before)
+        control.node_polygon_modified()
+
+    def redo(self, control):
+        control.node_polygon.assign(self.after)
+        control.node_polygon_modified()
+
+    def merge(self, other):
+        return None
+
+
+class EditGroup:
+    def __init__(self, entries):
+        self.entries = entries
+
+    def undo(self, control):
+        for entry in reversed(self.entries):
+            entry.undo(control)
+
+    def redo(self, control):
+        for entry in self.entries:
+            entry.redo(control)
+
+
+class History:
+    def __init__(self, limit=HISTORY_LIMIT):
+        self.limit = limit
+        self.undo_stack = []
+        self.redo_stack = []
+        # edits of the stroke in progress, None outside of a stroke
+        self.group = None
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.group = None
+
+    def begin_group(self):
+        self.end_group()
+        self.group = []
+
+    def end_group(self):
+        if self.group is None:
+            return
+        entries = self.group
+        self.group = None
+        if len(entries) == 1:
+            self.push(entries[0])
+        elif entries:
+            self.push(EditGroup(entries))
+
+    def record(self, entry):
+        if self.group is None:
+            self.push(entry)
+            return
+        merged = self.group[-1].merge(entry) if self.group else None
+        if merged is None:
+            self.group.append(entry)
+        else:
+            self.group[-1] = merged
+
+    def push(self, entry):
+        self.undo_stack.append(entry)
+        self.redo_stack.clear()
+        if len(self.undo_stack) > self.limit:
+            del self.undo_stack[0]
+
+    def undo(self, control):
+        self.end_group()
+        if not self.undo_stack:
+            return False
+        entry = self.undo_stack.pop()
+        entry.undo(control)
+        self.redo_stack.append(entry)
+        return True
+
+    def redo(self, control):
+        self.end_group()
+        if not self.redo_stack:
+            return False
+        entry = self.redo_stack.pop()
+        entry.redo(control)
+        self.undo_stack.append(entry)
+        return True
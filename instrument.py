@@ -0,0 +1,146 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from Constant import TRACE_PATH, TRACE_OVERLAY, TRACE_EVENT_LIMIT
+
+# Opt-in latency instrumentation. With DRAW_POLY_TRACE set, every @traced function and every
+# render is recorded into per-name latency histograms and a Chrome trace (chrome://tracing or
+# ui.perfetto.dev) that is written to that path on exit. Without it @traced returns the function
+# itself, so there is no overhead at all.
+
+# histogram bucket n counts durations below 2 ** n microseconds
+NUM_BUCKETS = 28
+
+
+class Recorder:
+    def __init__(self, path=None, event_limit=TRACE_EVENT_LIMIT):
+        self.path = path
+        self.enabled = path is not None
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = deque(maxlen=event_limit)
+        self.histograms = {}
+        self.lock = threading.Lock()
+        # the latest span, shown by the overlay
+        self.last_name = ''
+        self.last_duration = 0.0
+
+    def now_us(self):
+        return (time.perf_counter() - self.origin) * 1e6
+
+    def add(self, name, start_us, duration_us):
+        with self.lock:
+            self.events.append((name, start_us, duration_us, threading.get_ident()))
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = np.zeros(NUM_BUCKETS, dtype=np.int64)
+            histogram[min(int(duration_us).bit_length(), NUM_BUCKETS - 1)] += 1
+            self.last_name = name
+            self.last_duration = duration_us
+
+    def span(self, name):
+        return Span(self, name)
+
+    def summary(self):
+        # percentiles are the upper bound of the bucket they fall in
+        summary = {}
+        with self.lock:
+            for name, histogram in self.histograms.items():
+                count = int(histogram.sum())
+                cumulative = np.cumsum(histogram)
+                summary[name] = dict(
+                    count=count,
+                    histogram_us=histogram.tolist(),
+                    **{'p%d_ms' % p: 2 ** int(np.searchsorted(cumulative, count * p / 100)) / 1000
+                       for p in (50, 95, 99)}
+                )
+        return summary
+
+    def write_trace(self, path=None):
+        path = path or self.path
+        with self.lock:
+            events = [dict(name=name, cat='draw-poly', ph='X', ts=start, dur=duration, pid=self.pid, tid=tid)
+                      for name, start, duration, tid in self.events]
+        with open(path, 'w') as f:
+            json.dump(dict(traceEvents=events, displayTimeUnit='ms', otherData=dict(latency=self.summary())), f)
+
+
+class Span:
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = self.recorder.now_us()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.add(self.name, self.start, self.recorder.now_us() - self.start)
+
+
+recorder = Recorder(TRACE_PATH)
+if recorder.enabled:
+    atexit.register(recorder.write_trace)
+
+
+def traced(function):
+    # records every call of function under its qualified name, when tracing is enabled
+    if not recorder.enabled:
+        return function
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with recorder.span(name):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def watch_render_window(render_window):
+    # records every render of the window, including the ones the interactor starts itself
+    if not recorder.enabled:
+        return
+    start = [0.0]
+
+    def render_start(obj, event):
+        start[0] = recorder.now_us()
+
+    def render_end(obj, event):
+        recorder.add('render', start[0], recorder.now_us() - start[0])
+
+    render_window.AddObserver('StartEvent', render_start)
+    render_window.AddObserver('EndEvent', render_end)
+
+
+class LatencyOverlay:
+    # frame rate and latest latency in the corner of the view, refreshed before every render
+    def __init__(self, render_window):
+        from vtkmodules.vtkRenderingCore import vtkTextActor
+        self.actor = vtkTextActor()
+        self.actor.SetDisplayPosition(10, 10)
+        self.actor.GetTextProperty().SetFontSize(14)
+        self.actor.GetTextProperty().SetColor(0, 0, 0)
+        self.frames = deque()
+        render_window.AddObserver('StartEvent', self.update)
+
+    def update(self, obj, event):
+        now = time.perf_counter()
+        self.frames.append(now)
+        while self.frames and self.frames[0] < now - 1:
+            self.frames.popleft()
+        self.actor.SetInput('%d fps | %s %.1f ms' % (len(self.frames), recorder.last_name,
+                                                     recorder.last_duration / 1000))
+
+
+def make_overlay(render_window):
+    if render_window is None or not (recorder.enabled and TRACE_OVERLAY):
+        return None
+    return LatencyOverlay(render_window)
@@ -0,0 +1,316 @@
+import math
+
+import numpy as np
+from vtkmodules.util.numpy_support import numpy_to_vtk, numpy_to_vtkIdTypeArray
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkCellArray, vtkPolyData
+
+
+def make_cell_array(offsets, connectivity):
+    # Wraps the numpy buffers without copying, the arrays keep a reference to them
+    ca = vtkCellArray()
+    ca.SetData(numpy_to_vtkIdTypeArray(offsets), numpy_to_vtkIdTypeArray(connectivity))
+    return ca
+
+
+def index_range(lo, hi, offset, count):
+    # indices k < count with lo <= k + offset <= hi, allowing for float32 coordinates
+    first = max(math.ceil(lo - offset - 1e-4), 0)
+    last = min(math.floor(hi - offset + 1e-4), count - 1)
+    return np.arange(first, last + 1, dtype=np.int64)
+
+
+class Lattice:
+    # Points are laid out as [lattice nodes..., center points...], so the center index of a
+    # center point id is just point_id - num_nodes. Center index i owns the `fan_size` triangles
+    # [i * fan_size, (i + 1) * fan_size), which are also its cell ids in to_polydata(), in the
+    # canonical neighbour order used by change_mesh.
+    fan_size = 0
+    # size of a cell of a regular grid with exactly one center in every cell, the texels of the
+    # zoomed out view (see gridview.py)
+    texel_size = (1.0, 1.0)
+    # what save() writes and load() restores
+    array_names = ('points', 'triangles', 'line_offsets', 'line_connectivity',
+                   'center_neighbors')
+    scalar_names = ('grid_size', 'num_nodes')
+
+    def __init__(self, grid_size):
+        self.grid_size = grid_size
+        self.points = None
+        self.triangles = None
+        self.line_offsets = None
+        self.line_connectivity = None
+        self.num_nodes = 0
+        # center_neighbors[c, slot] is the center across the outer edge of triangle slot of center
+        # index c, -1 outside the grid
+        self.center_neighbors = None
+
+    @property
+    def num_centers(self):
+        return self.points.shape[0] - self.num_nodes
+
+    @property
+    def num_lines(self):
+        return self.line_offsets.shape[0] - 1
+
+    @property
+    def center_points(self):
+        return range(self.num_nodes, self.points.shape[0])
+
+    def within_tolerance(self, point, x, y, tolerance):
+        # same acceptance box as vtkPointPicker
+        px = self.points[point, 0]
+        py = self.points[point, 1]
+        return np.where(np.maximum(np.abs(x - px), np.abs(y - py)) <= tolerance, point, -1)
+
+    def save(self, path):
+        arrays = {name: getattr(self, name) for name in self.array_names}
+        arrays.update({name: np.array(getattr(self, name)) for name in self.scalar_names})
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        lattice = cls.__new__(cls)
+        with np.load(path) as data:
+            for name in cls.array_names:
+                setattr(lattice, name, data[name])
+            for name in cls.scalar_names:
+                setattr(lattice, name, int(data[name]))
+        return lattice
+
+    def make_points(self):
+        points = vtkPoints()
+        points.SetData(numpy_to_vtk(self.points))
+        return points
+
+    def to_polydata(self, points=None):
+        # the center fan triangles, what selection colors and ray cast picking hits
+        poly_data = vtkPolyData()
+        poly_data.SetPoints(self.make_points() if points is None else points)
+        poly_data.SetPolys(make_cell_array(
+            np.arange(0, self.triangles.size + 1, 3, dtype=np.int64),
+            self.triangles.reshape(-1)
+        ))
+        return poly_data
+
+    def lines_to_polydata(self, points=None):
+        # the lattice lines, only drawn
+        poly_data = vtkPolyData()
+        poly_data.SetPoints(self.make_points() if points is None else points)
+        poly_data.SetLines(make_cell_array(self.line_offsets, self.line_connectivity))
+        return poly_data
+
+
+class QuadLattice(Lattice):
+    # canonical neighbour order: left, bottom, top, right
+    fan_size = 4
+
+    def __init__(self, grid_size):
+        super().__init__(grid_size)
+        g = grid_size
+        self.num_nodes = g * g
+
+        self.points = np.zeros((g * g + (g - 1) * (g - 1), 3), dtype=np.float32)
+        nodes = self.points[:g * g].reshape(g, g, 3)
+        nodes[..., 0] = np.arange(g)
+        nodes[..., 1] = np.arange(g)[:, None]
+        centers = self.points[g * g:].reshape(g - 1, g - 1, 3)
+        centers[..., 0] = np.arange(g - 1) + 0.5
+        centers[..., 1] = np.arange(g - 1)[:, None] + 0.5
+
+        # rows first, then columns, like the original polylines
+        ids = np.arange(g * g, dtype=np.int64).reshape(g, g)
+        self.line_connectivity = np.concatenate((ids.ravel(), ids.T.ravel()))
+        self.line_offsets = np.arange(0, 2 * g * g + 1, g, dtype=np.int64)
+
+        c = np.arange(g * g, self.points.shape[0], dtype=np.int64).reshape(g - 1, g - 1)
+        p00 = ids[:-1, :-1]
+        p10 = ids[:-1, 1:]
+        p01 = ids[1:, :-1]
+        p11 = ids[1:, 1:]
+        triangles = np.empty((g - 1, g - 1, 4, 3), dtype=np.int64)
+        triangles[..., 0] = c[..., None]
+        triangles[:, :, 0, 1], triangles[:, :, 0, 2] = p01, p00
+        triangles[:, :, 1, 1], triangles[:, :, 1, 2] = p00, p10
+        triangles[:, :, 2, 1], triangles[:, :, 2, 2] = p11, p01
+        triangles[:, :, 3, 1], triangles[:, :, 3, 2] = p10, p11
+        self.triangles = triangles.reshape(-1, 3)
+
+        self.center_neighbors = self.build_center_neighbors()
+
+    def build_center_neighbors(self):
+        g = self.grid_size - 1
+        ids = np.full((g + 2, g + 2), -1, dtype=np.int64)
+        ids[1:-1, 1:-1] = np.arange(self.num_nodes, self.num_nodes + g * g).reshape(g, g)
+        neighbors = np.empty((g, g, 4), dtype=np.int64)
+        neighbors[..., 0] = ids[1:-1, :-2]
+        neighbors[..., 1] = ids[:-2, 1:-1]
+        neighbors[..., 2] = ids[2:, 1:-1]
+        neighbors[..., 3] = ids[1:-1, 2:]
+        return neighbors.reshape(-1, 4)
+
+    def locate_center(self, x, y):
+        # center point of the square under (x, y), -1 outside the grid
+        g = self.grid_size
+        i = np.floor(x).astype(np.int64)
+        j = np.floor(y).astype(np.int64)
+        inside = (i >= 0) & (i < g - 1) & (j >= 0) & (j < g - 1)
+        return np.where(inside, self.num_nodes + j * (g - 1) + i, -1)
+
+    def locate_point(self, x, y, tolerance):
+        # nearest node or center point, -1 if it is further away than tolerance
+        g = self.grid_size
+        nx = np.clip(np.rint(x), 0, g - 1)
+        ny = np.clip(np.rint(y), 0, g - 1)
+        node_dist = np.hypot(x - nx, y - ny)
+        cx = np.clip(np.floor(x), 0, g - 2)
+        cy = np.clip(np.floor(y), 0, g - 2)
+        center_dist = np.hypot(x - cx - 0.5, y - cy - 0.5)
+
+        point = np.where(center_dist < node_dist, self.num_nodes + cy * (g - 1) + cx, ny * g + nx)
+        return self.within_tolerance(point.astype(np.int64), x, y, tolerance)
+
+    def points_in_box(self, xmin, ymin, xmax, ymax):
+        # ids of the nodes and centers inside the box, without looking at the other points
+        g = self.grid_size
+        nx = index_range(xmin, xmax, 0, g)
+        ny = index_range(ymin, ymax, 0, g)
+        cx = index_range(xmin, xmax, 0.5, g - 1)
+        cy = index_range(ymin, ymax, 0.5, g - 1)
+        nodes = ny[:, None] * g + nx
+        centers = self.num_nodes + cy[:, None] * (g - 1) + cx
+        return np.concatenate((nodes.ravel(), centers.ravel()))
+
+
+class HexagonLattice(Lattice):
+    # canonical neighbour order: lower left, upper left, bottom, top, lower right, upper right
+    fan_size = 6
+    # centers repeat every 3 units along a row, rows of them alternate by half of that
+    texel_size = (1.5, 2 * math.sin(math.pi / 3))
+    # (center, ring[e], ring[e + 1]) of every canonical slot, as columns of the
+    # [center, ring0, ..., ring5, ring0] table built below
+    fan_columns = (0, 6, 7, 0, 5, 6, 0, 1, 2, 0, 4, 5, 0, 2, 3, 0, 3, 4)
+    array_names = Lattice.array_names + ('point_ids',)
+    scalar_names = Lattice.scalar_names + ('rows', 'row_size')
+
+    def __init__(self, grid_size):
+        super().__init__(grid_size)
+        n = grid_size if grid_size % 2 == 0 else grid_size - 1
+        rows = n * 3
+        half = rows // 2
+        self.rows = rows
+        self.row_size = half
+
+        # Rows alternate between x = k + 0.5 (even) and x = k (odd), so every point has six
+        # neighbours at distance 1. Every third point of a row is a hexagon center, shifted
+        # by 1.5 on each row, and only hexagons with all six neighbours inside are kept.
+        r = np.arange(rows)[:, None]
+        k = np.arange(half)[None, :]
+        is_center = ((r >= 1) & (r <= rows - 2) & (k % 3 == 2 - r % 2) & (k < half - 3)).ravel()
+
+        num_points = rows * half
+        self.num_nodes = num_points - int(np.count_nonzero(is_center))
+        # point id of every lattice position, in row-major order
+        self.point_ids = np.empty(num_points, dtype=np.int64)
+        self.point_ids[~is_center] = np.arange(self.num_nodes, dtype=np.int64)
+        self.point_ids[is_center] = np.arange(self.num_nodes, num_points, dtype=np.int64)
+
+        positions = np.zeros((rows, half, 3), dtype=np.float32)
+        positions[..., 0] = k + 0.5 * (1 - r % 2)
+        positions[..., 1] = r * math.sin(math.pi / 3)
+        positions = positions.reshape(-1, 3)
+        self.points = np.empty((num_points, 3), dtype=np.float32)
+        self.points[:self.num_nodes] = positions[~is_center]
+        self.points[self.num_nodes:] = positions[is_center]
+
+        # neighbours counter-clockwise from the lower left one
+        c = np.flatnonzero(is_center)
+        d = 1 - (c // half) % 2
+        ring = np.empty((c.size, 8), dtype=np.int64)
+        ring[:, 0] = np.arange(self.num_nodes, num_points, dtype=np.int64)
+        ring[:, 1] = self.point_ids[c - half - 1 + d]
+        ring[:, 2] = self.point_ids[c - half + d]
+        ring[:, 3] = self.point_ids[c + 1]
+        ring[:, 4] = self.point_ids[c + half + d]
+        ring[:, 5] = self.point_ids[c + half - 1 + d]
+        ring[:, 6] = self.point_ids[c - 1]
+        ring[:, 7] = ring[:, 1]
+
+        # closed outline polyline of every hexagon
+        self.line_connectivity = np.ascontiguousarray(ring[:, 1:]).reshape(-1)
+        self.line_offsets = np.arange(0, self.line_connectivity.size + 1, 7, dtype=np.int64)
+
+        self.triangles = np.take(ring, self.fan_columns, axis=1).reshape(-1, 3)
+
+        self.center_neighbors = self.build_center_neighbors()
+
+    def build_center_neighbors(self):
+        # Centers form a (rows - 2) x centers_per_row grid. Seen from row r, the neighbouring
+        # center rows r +- 1 are shifted by half a column, rows r +- 2 are straight above/below.
+        m = self.row_size // 3 - 1
+        ids = np.full((self.rows + 2, m + 2), -1, dtype=np.int64)
+        ids[2:-2, 1:-1] = np.arange(self.num_nodes, self.num_nodes + (self.rows - 2) * m).reshape(-1, m)
+        # ids[row + 1, index + 1] is the center at `index` of lattice row `row`, -1 outside
+        neighbors = np.empty((self.rows - 2, m, 6), dtype=np.int64)
+        r = np.arange(1, self.rows - 1)
+        col = np.arange(m)
+        left = col[None, :] - (r[:, None] % 2) + 1
+        right = left + 1
+        rr = r[:, None] + 1
+        neighbors[..., 0] = ids[rr - 1, left]
+        neighbors[..., 1] = ids[rr + 1, left]
+        neighbors[..., 2] = ids[rr - 2, col + 1]
+        neighbors[..., 3] = ids[rr + 2, col + 1]
+        neighbors[..., 4] = ids[rr - 1, right]
+        neighbors[..., 5] = ids[rr + 1, right]
+        return neighbors.reshape(-1, 6)
+
+    def locate_center(self, x, y):
+        # center point of the hexagon under (x, y), -1 outside every hexagon
+        h = math.sin(math.pi / 3)
+        centers_per_row = self.row_size // 3 - 1
+        r0 = np.floor(np.asarray(y) / h).astype(np.int64)
+        best = np.full(r0.shape, -1, dtype=np.int64)
+        best_dist = np.full(r0.shape, np.inf)
+        # the nearest center of the staggered center rows is at most one unit away
+        for dr in (-1, 0, 1, 2):
+            r = np.clip(r0 + dr, 1, self.rows - 2)
+            first_x = 2.5 - 1.5 * (r % 2)
+            m = np.clip(np.rint((x - first_x) / 3), 0, centers_per_row - 1).astype(np.int64)
+            dx = np.abs(x - first_x - 3 * m)
+            dy = np.abs(y - r * h)
+            dist = np.hypot(dx, dy)
+            inside = (dy <= h) & (h * dx + 0.5 * dy <= h) & (dist < best_dist)
+            best = np.where(inside, self.num_nodes + (r - 1) * centers_per_row + m, best)
+            best_dist = np.where(inside, dist, best_dist)
+        return best
+
+    def locate_point(self, x, y, tolerance):
+        # nearest lattice point, -1 if it is further away than tolerance
+        h = math.sin(math.pi / 3)
+        half = self.row_size
+        r0 = np.floor(np.asarray(y) / h).astype(np.int64)
+        best = np.full(r0.shape, -1, dtype=np.int64)
+        best_dist = np.full(r0.shape, np.inf)
+        for dr in (0, 1):
+            r = np.clip(r0 + dr, 0, self.rows - 1)
+            shift = 0.5 * (1 - r % 2)
+            k = np.clip(np.rint(x - shift), 0, half - 1).astype(np.int64)
+            dist = np.hypot(x - k - shift, y - r * h)
+            closer = dist < best_dist
+            best = np.where(closer, self.point_ids[r * half + k], best)
+            best_dist = np.where(closer, dist, best_dist)
+        return self.within_tolerance(best, x, y, tolerance)
+
+    def points_in_box(self, xmin, ymin, xmax, ymax):
+        # ids of the lattice points inside the box, without looking at the other points
+        h = math.sin(math.pi / 3)
+        half = self.row_size
+        r = index_range(ymin / h, ymax / h, 0, self.rows)
+        ids = []
+        for parity in (0, 1):
+            k = index_range(xmin, xmax, 0.5 * (1 - parity), half)
+            rows = r[r % 2 == parity]
+            ids.append(self.point_ids[(rows[:, None] * half + k).ravel()])
+        return np.concatenate(ids)
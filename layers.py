@@ -0,0 +1,34 @@
+import numpy as np
+
+from history import History
+from nodepolygon import NodePolygon
+
+# Named selection layers on one lattice. A layer is only selection state: shape codes, cell and
+# point masks, the node polygon and its own undo history. The lattice, grid_data and the actors
+# are shared, VTKControl hands the masks of the active layer to grid_data without copying them.
+
+# vtkNamedColors names, handed out in turn to new layers
+LAYER_COLORS = ('Plum', 'LightSkyBlue', 'Khaki', 'LightSalmon', 'MediumAquamarine', 'Orchid')
+
+
+class SelectionLayer:
+    def __init__(self, name, color, lattice, num_cells):
+        self.name = name
+        self.color = color
+        # shape code of every center, -1 for centers that are not selected
+        self.center_shapes = np.full(lattice.num_centers, -1, dtype=np.int8)
+        self.cell_mask = np.zeros(num_cells, dtype=np.uint8)
+        self.point_mask = np.zeros(lattice.points.shape[0], dtype=np.uint8)
+        self.node_polygon = NodePolygon(lattice.points, self.point_mask)
+        self.history = History()
+
+
+def unique_layer_name(layers, name):
+    # name, or name with the first free number appended when another layer has it already
+    names = {layer.name for layer in layers}
+    if name not in names:
+        return name
+    number = 2
+    while '%s %d' % (name, number) in names:
+        number += 1
+    return '%s %d' % (name, number)
@@ -26,6 +26,8 @@ class Ui_MainWindow(object):
         self.menubar.setObjectName("menubar")
         self.menuMenu = QtWidgets.QMenu(parent=self.menubar)
         self.menuMenu.setObjectName("menuMenu")
+        self.menuSelection = QtWidgets.QMenu(parent=self.menubar)
+        self.menuSelection.setObjectName("menuSelection")
         MainWindow.setMenuBar(self.menubar)
         self.statusbar = QtWidgets.QStatusBar(parent=MainWindow)
         self.statusbar.setObjectName("statusbar")
@@ -37,12 +39,36 @@ class Ui_MainWindow(object):
         self.dockWidget.setObjectName("dockWidget")
         self.dockWidgetContents = QtWidgets.QWidget()
         self.dockWidgetContents.setObjectName("dockWidgetContents")
+        self.layerLayout = QtWidgets.QVBoxLayout(self.dockWidgetContents)
+        self.layerLayout.setObjectName("layerLayout")
+        self.layerList = QtWidgets.QListWidget(parent=self.dockWidgetContents)
+        self.layerList.setObjectName("layerList")
+        self.layerLayout.addWidget(self.layerList)
+        self.layerButtonLayout = QtWidgets.QHBoxLayout()
+        self.layerButtonLayout.setObjectName("layerButtonLayout")
+        self.addLayerButton = QtWidgets.QPushButton(parent=self.dockWidgetContents)
+        self.addLayerButton.setObjectName("addLayerButton")
+        self.layerButtonLayout.addWidget(self.addLayerButton)
+        self.removeLayerButton = QtWidgets.QPushButton(parent=self.dockWidgetContents)
+        self.removeLayerButton.setObjectName("removeLayerButton")
+        self.layerButtonLayout.addWidget(self.removeLayerButton)
+        self.layerLayout.addLayout(self.layerButtonLayout)
         self.dockWidget.setWidget(self.dockWidgetContents)
         MainWindow.addDockWidget(QtCore.Qt.DockWidgetArea(2), self.dockWidget)
         self.actionSave = QtGui.QAction(parent=MainWindow)
         icon = QtGui.QIcon.fromTheme("document-save")
         self.actionSave.setIcon(icon)
         self.actionSave.setObjectName("actionSave")
+        self.actionSaveMerged = QtGui.QAction(parent=MainWindow)
+        self.actionSaveMerged.setObjectName("actionSaveMerged")
+        self.actionUndo = QtGui.QAction(parent=MainWindow)
+        self.actionUndo.setObjectName("actionUndo")
+        self.actionRedo = QtGui.QAction(parent=MainWindow)
+        self.actionRedo.setObjectName("actionRedo")
+        self.actionOpenSession = QtGui.QAction(parent=MainWindow)
+        self.actionOpenSession.setObjectName("actionOpenSession")
+        self.actionSaveSession = QtGui.QAction(parent=MainWindow)
+        self.actionSaveSession.setObjectName("actionSaveSession")
         self.actionMesh = QtGui.QAction(parent=MainWindow)
         self.actionMesh.setCheckable(True)
         self.actionMesh.setObjectName("actionMesh")
@@ -55,8 +81,53 @@ class Ui_MainWindow(object):
         self.actionQuad = QtGui.QAction(parent=MainWindow)
         self.actionQuad.setCheckable(True)
         self.actionQuad.setObjectName("actionQuad")
+        self.actionPaint = QtGui.QAction(parent=MainWindow)
+        self.actionPaint.setCheckable(True)
+        self.actionPaint.setObjectName("actionPaint")
+        self.actionBox = QtGui.QAction(parent=MainWindow)
+        self.actionBox.setCheckable(True)
+        self.actionBox.setObjectName("actionBox")
+        self.actionLasso = QtGui.QAction(parent=MainWindow)
+        self.actionLasso.setCheckable(True)
+        self.actionLasso.setObjectName("actionLasso")
+        self.actionFill = QtGui.QAction(parent=MainWindow)
+        self.actionFill.setCheckable(True)
+        self.actionFill.setObjectName("actionFill")
+        self.actionGrow = QtGui.QAction(parent=MainWindow)
+        self.actionGrow.setObjectName("actionGrow")
+        self.actionShrink = QtGui.QAction(parent=MainWindow)
+        self.actionShrink.setObjectName("actionShrink")
+        self.actionInvert = QtGui.QAction(parent=MainWindow)
+        self.actionInvert.setObjectName("actionInvert")
+        self.actionFillHoles = QtGui.QAction(parent=MainWindow)
+        self.actionFillHoles.setObjectName("actionFillHoles")
+        self.actionStoreSelection = QtGui.QAction(parent=MainWindow)
+        self.actionStoreSelection.setObjectName("actionStoreSelection")
+        self.actionUnion = QtGui.QAction(parent=MainWindow)
+        self.actionUnion.setObjectName("actionUnion")
+        self.actionIntersect = QtGui.QAction(parent=MainWindow)
+        self.actionIntersect.setObjectName("actionIntersect")
+        self.actionSubtract = QtGui.QAction(parent=MainWindow)
+        self.actionSubtract.setObjectName("actionSubtract")
         self.menuMenu.addAction(self.actionSave)
+        self.menuMenu.addAction(self.actionSaveMerged)
+        self.menuMenu.addSeparator()
+        self.menuMenu.addAction(self.actionUndo)
+        self.menuMenu.addAction(self.actionRedo)
+        self.menuMenu.addSeparator()
+        self.menuMenu.addAction(self.actionOpenSession)
+        self.menuMenu.addAction(self.actionSaveSession)
+        self.menuSelection.addAction(self.actionGrow)
+        self.menuSelection.addAction(self.actionShrink)
+        self.menuSelection.addAction(self.actionInvert)
+        self.menuSelection.addAction(self.actionFillHoles)
+        self.menuSelection.addSeparator()
+        self.menuSelection.addAction(self.actionStoreSelection)
+        self.menuSelection.addAction(self.actionUnion)
+        self.menuSelection.addAction(self.actionIntersect)
+        self.menuSelection.addAction(self.actionSubtract)
         self.menubar.addAction(self.menuMenu.menuAction())
+        self.menubar.addAction(self.menuSelection.menuAction())
         self.toolBar.addAction(self.actionSave)
         self.toolBar.addSeparator()
         self.toolBar.addAction(self.actionQuad)
@@ -64,6 +135,11 @@ class Ui_MainWindow(object):
         self.toolBar.addSeparator()
         self.toolBar.addAction(self.actionMesh)
         self.toolBar.addAction(self.actionNode)
+        self.toolBar.addSeparator()
+        self.toolBar.addAction(self.actionPaint)
+        self.toolBar.addAction(self.actionBox)
+        self.toolBar.addAction(self.actionLasso)
+        self.toolBar.addAction(self.actionFill)
 
         self.retranslateUi(MainWindow)
         QtCore.QMetaObject.connectSlotsByName(MainWindow)
@@ -72,13 +148,41 @@ class Ui_MainWindow(object):
         _translate = QtCore.QCoreApplication.translate
         MainWindow.setWindowTitle(_translate("MainWindow", "MainWindow"))
         self.menuMenu.setTitle(_translate("MainWindow", "Menu"))
+        self.menuSelection.setTitle(_translate("MainWindow", "Selection"))
         self.toolBar.setWindowTitle(_translate("MainWindow", "toolBar"))
+        self.dockWidget.setWindowTitle(_translate("MainWindow", "Layers"))
+        self.addLayerButton.setText(_translate("MainWindow", "Add"))
+        self.removeLayerButton.setText(_translate("MainWindow", "Remove"))
         self.actionSave.setText(_translate("MainWindow", "Save"))
         self.actionSave.setShortcut(_translate("MainWindow", "Ctrl+S"))
+        self.actionSaveMerged.setText(_translate("MainWindow", "Save Merged Layers"))
+        self.actionUndo.setText(_translate("MainWindow", "Undo"))
+        self.actionUndo.setShortcut(_translate("MainWindow", "Ctrl+Z"))
+        self.actionRedo.setText(_translate("MainWindow", "Redo"))
+        self.actionRedo.setShortcut(_translate("MainWindow", "Ctrl+Y"))
+        self.actionOpenSession.setText(_translate("MainWindow", "Open Session"))
+        self.actionOpenSession.setShortcut(_translate("MainWindow", "Ctrl+O"))
+        self.actionSaveSession.setText(_translate("MainWindow", "Save Session"))
+        self.actionSaveSession.setShortcut(_translate("MainWindow", "Ctrl+Shift+S"))
         self.actionMesh.setText(_translate("MainWindow", "Mesh"))
         self.actionNode.setText(_translate("MainWindow", "Node"))
         self.actionHexagon.setText(_translate("MainWindow", "Hexagon"))
         self.actionQuad.setText(_translate("MainWindow", "Quad"))
+        self.actionPaint.setText(_translate("MainWindow", "Paint"))
+        self.actionBox.setText(_translate("MainWindow", "Box"))
+        self.actionLasso.setText(_translate("MainWindow", "Lasso"))
+        self.actionFill.setText(_translate("MainWindow", "Fill"))
+        self.actionGrow.setText(_translate("MainWindow", "Grow"))
+        self.actionGrow.setShortcut(_translate("MainWindow", "Ctrl+G"))
+        self.actionShrink.setText(_translate("MainWindow", "Shrink"))
+        self.actionShrink.setShortcut(_translate("MainWindow", "Ctrl+Shift+G"))
+        self.actionInvert.setText(_translate("MainWindow", "Invert"))
+        self.actionInvert.setShortcut(_translate("MainWindow", "Ctrl+I"))
+        self.actionFillHoles.setText(_translate("MainWindow", "Fill Holes"))
+        self.actionStoreSelection.setText(_translate("MainWindow", "Store Selection"))
+        self.actionUnion.setText(_translate("MainWindow", "Union with Stored"))
+        self.actionIntersect.setText(_translate("MainWindow", "Intersect with Stored"))
+        self.actionSubtract.setText(_translate("MainWindow", "Subtract Stored"))
 from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
 
 
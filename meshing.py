@@ -0,0 +1,185 @@
+import numpy as np
+from vtkmodules.util.numpy_support import numpy_to_vtk
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkPolyData, vtkUnstructuredGrid
+
+from lattice import make_cell_array
+from shapes import kept_cells_face_table, shape_face_table
+
+VTK_TRIANGLE = 5
+VTK_QUAD = 9
+
+
+def empty_mesh(lattice):
+    return (np.zeros((0, 3), dtype=lattice.points.dtype), np.zeros(1, dtype=np.int64),
+            np.zeros(0, dtype=np.int64))
+
+
+def regenerate_mesh(lattice, grid_type, center_shapes, progress=None):
+    # Builds the exported polygons of every selected center from the shape tables.
+    # Returns (points, offsets, connectivity) with the points compacted to the ones in use,
+    # the polygons ordered by center and then by face. progress(fraction) is told the share of
+    # the selected centers done after every shape.
+    return mesh_from_faces(lattice, shape_face_table(grid_type, lattice.fan_size), center_shapes, progress)
+
+
+def regenerate_merged_mesh(lattice, grid_type, kept_cells, progress=None):
+    # regenerate_mesh for the kept cell bitmasks of shapes.merge_kept_cells, which exports exactly
+    # the cells kept by any of the merged selections
+    return mesh_from_faces(lattice, kept_cells_face_table(grid_type, lattice.fan_size), kept_cells, progress)
+
+
+def mesh_from_faces(lattice, faces, center_shapes, progress=None):
+    # faces[code] lists the polygons of a center with that code, -1 codes are left out
+    max_faces = max(len(shape_faces) for shape_faces in faces)
+    fan_points = lattice.triangles.reshape(lattice.num_centers, lattice.fan_size * 3)
+
+    selected = np.flatnonzero(center_shapes >= 0)
+    shapes = center_shapes[selected]
+    keys = []
+    polygons = []
+    done = 0
+    for shape in np.unique(shapes).tolist():
+        centers = selected[shapes == shape]
+        corners = fan_points[centers]
+        for n, face in enumerate(faces[shape]):
+            polygon = np.full((centers.size, 4), -1, dtype=np.int64)
+            polygon[:, :len(face)] = corners[:, face]
+            keys.append(centers * max_faces + n)
+            polygons.append(polygon)
+        done += centers.size
+        if progress is not None:
+            progress(done / selected.size)
+
+    if not polygons:
+        return empty_mesh(lattice)
+
+    polygons = np.concatenate(polygons)[np.argsort(np.concatenate(keys), kind='stable')]
+    sizes = (polygons >= 0).sum(axis=1)
+    offsets = np.zeros(sizes.size + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    connectivity = polygons[polygons >= 0]
+
+    # renumber the points in use, keeping their lattice order
+    used = np.zeros(lattice.points.shape[0], dtype=bool)
+    used[connectivity] = True
+    new_ids = np.cumsum(used, dtype=np.int64) - 1
+    return lattice.points[used], offsets, new_ids[connectivity]
+
+
+def merge_meshes(lattice, meshes):
+    # One mesh with the polygons of all meshes in turn. They all come from the same lattice, so
+    # equal coordinates are the same lattice point and are welded into one point, and a polygon
+    # on the same points as an earlier one is left out.
+    meshes = [mesh for mesh in meshes if mesh[1].size > 1]
+    if not meshes:
+        return empty_mesh(lattice)
+    points, inverse = np.unique(np.concatenate([mesh[0] for mesh in meshes]), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1).astype(np.int64)
+    sizes = []
+    connectivity = []
+    point_base = 0
+    for part_points, part_offsets, part_connectivity in meshes:
+        sizes.append(np.diff(part_offsets))
+        connectivity.append(inverse[point_base + part_connectivity])
+        point_base += part_points.shape[0]
+    sizes = np.concatenate(sizes)
+    connectivity = np.concatenate(connectivity)
+
+    # polygons as rows padded with -1, compared by their sorted point ids
+    filled = np.arange(sizes.max()) < sizes[:, None]
+    polygons = np.full(filled.shape, -1, dtype=np.int64)
+    polygons[filled] = connectivity
+    first = np.sort(np.unique(np.sort(polygons, axis=1), axis=0, return_index=True)[1])
+    offsets = np.zeros(first.size + 1, dtype=np.int64)
+    np.cumsum(sizes[first], out=offsets[1:])
+    return points, offsets, polygons[first][filled[first]]
+
+
+def mesh_points(points):
+    vtk_points = vtkPoints()
+    vtk_points.SetData(numpy_to_vtk(points))
+    return vtk_points
+
+
+def mesh_to_polydata(points, offsets, connectivity):
+    poly_data = vtkPolyData()
+    poly_data.SetPoints(mesh_points(points))
+    poly_data.SetPolys(make_cell_array(offsets, connectivity))
+    return poly_data
+
+
+def mesh_to_unstructured_grid(points, offsets, connectivity):
+    cell_types = np.where(np.diff(offsets) == 4, VTK_QUAD, VTK_TRIANGLE).astype(np.uint8)
+    grid = vtkUnstructuredGrid()
+    grid.SetPoints(mesh_points(points))
+    grid.SetCells(numpy_to_vtk(cell_types), make_cell_array(offsets, connectivity))
+    return grid
+
+
+def points_in_polygon(x, y, polygon, tolerance=1e-4):
+    # Even-odd test of the points (x, y) against the closed polygon (n x 2), points on its outline
+    # count as inside. Points with the same y share the crossings of their row, so the cost grows
+    # with the number of points and the rows crossed by the edges, not points times edges.
+    ys, row = np.unique(y, return_inverse=True)
+    row = row.reshape(-1)
+    x0 = polygon[:, 0]
+    y0 = polygon[:, 1]
+    x1 = np.roll(x0, -1)
+    y1 = np.roll(y0, -1)
+
+    # every (edge, row) pair where the edge reaches the row
+    lo = np.searchsorted(ys, np.minimum(y0, y1) - tolerance, 'left')
+    counts = np.searchsorted(ys, np.maximum(y0, y1) + tolerance, 'right') - lo
+    edge = np.repeat(np.arange(polygon.shape[0]), counts)
+    pair_row = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(edge.size)
+    py = ys[pair_row]
+    ex0, ey0, ex1, ey1 = x0[edge], y0[edge], x1[edge], y1[edge]
+    horizontal = np.abs(ey1 - ey0) <= tolerance
+    t = np.where(horizontal, 0, (py - ey0) / np.where(horizontal, 1, ey1 - ey0))
+    cross_x = ex0 + t * (ex1 - ex0)
+    # half-open rule, an edge crosses a row when exactly one of its ends is above it
+    crossing = (ey0 > py) != (ey1 > py)
+
+    # Rows are laid out one after another on a single sorted axis, row r covering
+    # [r * width, r * width + span), so one searchsorted answers every row at once.
+    base = min(x.min(), x0.min()) - 1
+    span = max(x.max(), x0.max()) - base + 1
+    width = 2 * span
+    key = row * width + (x - base)
+    pair_key = pair_row * width - base
+
+    crossings = np.sort(pair_key[crossing] + cross_x[crossing])
+    left = np.searchsorted(crossings, key) - np.searchsorted(crossings, row * width)
+    odd = left % 2 == 1
+
+    # the part of the outline on every row, a single point or a horizontal edge
+    starts = np.sort(pair_key + np.where(horizontal, np.minimum(ex0, ex1), cross_x))
+    ends = np.sort(pair_key + np.where(horizontal, np.maximum(ex0, ex1), cross_x))
+    on_outline = np.searchsorted(starts, key + tolerance, 'right') > np.searchsorted(ends, key - tolerance, 'left')
+    return odd | on_outline
+
+
+def fill_polygon_nodes(lattice, polygon_ids):
+    # The lattice triangles with all three points inside the polygon through polygon_ids (node
+    # mode), as (points, offsets, connectivity). Only points in the bounding box are tested.
+    if len(polygon_ids) < 3:
+        return empty_mesh(lattice)
+    polygon = lattice.points[np.asarray(polygon_ids, dtype=np.int64), :2].astype(np.float64)
+    candidates = lattice.points_in_box(*polygon.min(axis=0), *polygon.max(axis=0))
+    if candidates.size == 0:
+        return empty_mesh(lattice)
+    inside = candidates[points_in_polygon(lattice.points[candidates, 0].astype(np.float64),
+                                          lattice.points[candidates, 1].astype(np.float64), polygon)]
+    inside.sort()
+
+    centers = inside[inside >= lattice.num_nodes] - lattice.num_nodes
+    fan = lattice.triangles.reshape(lattice.num_centers, -1)[centers].reshape(-1, 3)
+    index = np.minimum(np.searchsorted(inside, fan[:, 1:]), inside.size - 1)
+    triangles = fan[(inside[index] == fan[:, 1:]).all(axis=1)]
+    if triangles.size == 0:
+        return empty_mesh(lattice)
+
+    point_ids, connectivity = np.unique(triangles, return_inverse=True)
+    offsets = np.arange(0, triangles.size + 1, 3, dtype=np.int64)
+    return lattice.points[point_ids], offsets, connectivity.reshape(-1).astype(np.int64)
@@ -0,0 +1,111 @@
+import numpy as np
+from vtkmodules.util.numpy_support import numpy_to_vtkIdTypeArray
+from vtkmodules.vtkCommonDataModel import vtkCellArray
+
+
+class NodePolygon:
+    # The node-mode polygon as an ordered set of point ids.
+    # Membership lives in the point mask that colors the selected nodes, so lookups are O(1),
+    # and the ids are kept in a growable buffer that VTK reads without copying: one polygon
+    # cell for the outline and the same ids as a poly-vertex cell for the nodes.
+    def __init__(self, points, point_mask, capacity=64):
+        self.points = points
+        self.mask = point_mask
+        self.buffer = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+        self.offsets = np.zeros(2, dtype=np.int64)
+        self.polys = vtkCellArray()
+        self.verts = vtkCellArray()
+        self.update_cells()
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, point_id):
+        return bool(self.mask[point_id])
+
+    @property
+    def ids(self):
+        return self.buffer[:self.size]
+
+    def assign(self, point_ids):
+        # replaces every vertex, keeping the first of repeated ids
+        point_ids = np.asarray(point_ids, dtype=np.int64).reshape(-1)
+        first = np.unique(point_ids, return_index=True)[1]
+        point_ids = point_ids[np.sort(first)]
+        self.mask[self.ids] = 0
+        self.reserve(point_ids.size)
+        self.buffer[:point_ids.size] = point_ids
+        self.size = point_ids.size
+        self.mask[point_ids] = 1
+        self.update_cells()
+
+    def index(self, point_id):
+        return int(np.flatnonzero(self.ids == point_id)[0])
+
+    def update_cells(self):
+        # only the two small wrappers are rebuilt, the ids themselves are not copied
+        self.offsets[1] = self.size
+        offsets = numpy_to_vtkIdTypeArray(self.offsets)
+        connectivity = numpy_to_vtkIdTypeArray(self.ids)
+        self.polys.SetData(offsets, connectivity)
+        self.verts.SetData(offsets, connectivity)
+
+    def reserve(self, size):
+        if size > self.buffer.size:
+            buffer = np.zeros(max(size, 2 * self.buffer.size), dtype=np.int64)
+            buffer[:self.size] = self.ids
+            self.buffer = buffer
+
+    # The editing methods return the position of the vertex they changed, -1 if nothing changed.
+
+    def insert(self, position, point_id):
+        if self.mask[point_id]:
+            return -1
+        self.reserve(self.size + 1)
+        self.buffer[position + 1:self.size + 1] = self.buffer[position:self.size].copy()
+        self.buffer[position] = point_id
+        self.size += 1
+        self.mask[point_id] = 1
+        self.update_cells()
+        return position
+
+    def append(self, point_id):
+        return self.insert(self.size, point_id)
+
+    def remove(self, point_id):
+        if not self.mask[point_id]:
+            return -1
+        position = self.index(point_id)
+        self.buffer[position:self.size - 1] = self.buffer[position + 1:self.size].copy()
+        self.size -= 1
+        self.mask[point_id] = 0
+        self.update_cells()
+        return position
+
+    def nearest_edge(self, point_id):
+        # position after which point_id is closest to the outline, the closing edge included
+        start = self.points[self.ids, :2].astype(np.float64)
+        edge = np.roll(start, -1, axis=0) - start
+        p = self.points[point_id, :2] - start
+        length = np.maximum((edge ** 2).sum(axis=1), 1e-12)
+        t = np.clip((p * edge).sum(axis=1) / length, 0, 1)
+        distance = ((p - t[:, None] * edge) ** 2).sum(axis=1)
+        return int(np.argmin(distance))
+
+    def insert_nearest(self, point_id):
+        # puts point_id on the closest edge instead of after the last vertex
+        if self.size < 2:
+            return self.append(point_id)
+        return self.insert(self.nearest_edge(point_id) + 1, point_id)
+
+    def move(self, point_id, new_point_id):
+        # replaces a vertex, keeping its place in the outline
+        if not self.mask[point_id] or self.mask[new_point_id]:
+            return -1
+        position = self.index(point_id)
+        self.buffer[position] = new_point_id
+        self.mask[point_id] = 0
+        self.mask[new_point_id] = 1
+        self.update_cells()
+        return position
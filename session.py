@@ -0,0 +1,115 @@
+import os
+import struct
+
+import numpy as np
+
+from export import ExportSnapshot
+from shapes import SHAPES
+
+# Session file layout, little endian:
+#   header: magic, version, grid type, interactor style, grid size,
+#           number of cells, number of points, number of centers, number of polygon ids
+#   then, each starting at a multiple of ALIGNMENT so they can be memory-mapped:
+#   cell mask bits, point mask bits (np.packbits), center shapes (int8), polygon ids (int64)
+# The cells are the triangles of the grid. Version 1 also had one (never selected) cell for every
+# lattice line ahead of them.
+SESSION_MAGIC = b'DRAWPOLY'
+SESSION_VERSION = 2
+SESSION_EXTENSION = '.dps'
+HEADER = struct.Struct('<8sHBBIQQQQ')
+ALIGNMENT = 64
+
+
+def session_layout(num_cells, num_points, num_centers, polygon_size):
+    # (dtype, count, file offset) of every array after the header
+    layout = []
+    offset = HEADER.size
+    for dtype, count in ((np.uint8, (num_cells + 7) // 8), (np.uint8, (num_points + 7) // 8),
+                         (np.int8, num_centers), (np.int64, polygon_size)):
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout.append((dtype, count, offset))
+        offset += count * np.dtype(dtype).itemsize
+    return layout
+
+
+class Session:
+    def __init__(self, grid_type, interactor_style, grid_size, num_cells, num_points, cell_bits, point_bits,
+                 center_shapes, polygon_ids, version=SESSION_VERSION):
+        self.version = version
+        self.grid_type = grid_type
+        self.interactor_style = interactor_style
+        self.grid_size = grid_size
+        self.num_cells = num_cells
+        self.num_points = num_points
+        self.cell_bits = cell_bits
+        self.point_bits = point_bits
+        self.center_shapes = center_shapes
+        self.polygon_ids = polygon_ids
+
+    def cell_mask(self):
+        return np.unpackbits(self.cell_bits, count=self.num_cells)
+
+    def point_mask(self):
+        return np.unpackbits(self.point_bits, count=self.num_points)
+
+    def line_cells(self, lattice):
+        # cells of the lattice lines ahead of the triangles in version 1 sessions
+        return lattice.num_lines if self.version == 1 else 0
+
+    def check(self, lattice):
+        # raises ValueError unless the session fits lattice, before any of it is loaded
+        if (self.num_cells != self.line_cells(lattice) + lattice.triangles.shape[0]
+                or self.num_points != lattice.points.shape[0] or self.center_shapes.size != lattice.num_centers):
+            raise ValueError('session does not match its grid')
+        if self.center_shapes.size and not (-1 <= self.center_shapes.min()
+                                            and self.center_shapes.max() < len(SHAPES[self.grid_type])):
+            raise ValueError('session has unknown center shapes')
+        if self.polygon_ids.size and not (0 <= self.polygon_ids.min() and self.polygon_ids.max() < lattice.num_nodes):
+            raise ValueError('session polygon is not made of lattice nodes')
+
+    def snapshot(self, lattice):
+        # exports the saved selection directly, without going through a VTKControl
+        return ExportSnapshot(lattice, self.grid_type, self.interactor_style, self.center_shapes,
+                              self.polygon_ids)
+
+
+def write_session(path, grid_type, interactor_style, grid_size, cell_mask, point_mask, center_shapes,
+                  polygon_ids):
+    polygon_ids = np.asarray(polygon_ids, dtype=np.int64)
+    arrays = (np.packbits(cell_mask.astype(bool)), np.packbits(point_mask.astype(bool)),
+              center_shapes.astype(np.int8), polygon_ids)
+    layout = session_layout(cell_mask.size, point_mask.size, center_shapes.size, polygon_ids.size)
+
+    # write to a temporary file first so a crash never leaves half a session behind
+    tmp_path = path + '.%d.tmp' % os.getpid()
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(SESSION_MAGIC, SESSION_VERSION, grid_type, interactor_style, grid_size,
+                            cell_mask.size, point_mask.size, center_shapes.size, polygon_ids.size))
+        for array, (dtype, count, offset) in zip(arrays, layout):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_session(path):
+    # The arrays are memory-mapped read-only, nothing is read until it is used
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError('not a session file: ' + path)
+    (magic, version, grid_type, interactor_style, grid_size,
+     num_cells, num_points, num_centers, polygon_size) = HEADER.unpack(header)
+    if magic != SESSION_MAGIC:
+        raise ValueError('not a session file: ' + path)
+    if version > SESSION_VERSION:
+        raise ValueError('session file version %d is newer than this program' % version)
+    if grid_type not in SHAPES or interactor_style not in (0, 1):
+        raise ValueError('not a session file: ' + path)
+
+    arrays = []
+    for dtype, count, offset in session_layout(num_cells, num_points, num_centers, polygon_size):
+        if count == 0:
+            arrays.append(np.zeros(0, dtype=dtype))
+        else:
+            arrays.append(np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,)))
+    return Session(grid_type, interactor_style, grid_size, num_cells, num_points, *arrays, version=version)
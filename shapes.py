@@ -0,0 +1,82 @@
+import numpy as np
+
+# Cells removed by every shape of a center, as a bitmask over the canonical neighbour order of
+# the lattice (bit n is the n-th triangle of the center's fan). Shape 0 keeps every cell.
+
+# left, bottom, top, right
+QUAD_SHAPES = (
+    0b0000, 0b0011, 0b0101, 0b1100, 0b1010, 0b0111, 0b1101, 0b1110, 0b1011,
+)
+
+# lower left, upper left, bottom, top, lower right, upper right
+HEXAGON_SHAPES = (
+    0b000000, 0b010101, 0b000111, 0b001011, 0b101010, 0b111000, 0b110100, 0b110101, 0b010111, 0b001111,
+    0b101011, 0b111010, 0b111100, 0b111101, 0b110111, 0b011111, 0b101111, 0b111011, 0b111110,
+)
+
+SHAPES = {
+    0: QUAD_SHAPES,
+    1: HEXAGON_SHAPES,
+}
+
+
+def shape_keep_table(grid_type, fan_size):
+    # keep[shape, n] is 1 when the n-th cell of a center with that shape stays selected
+    removed = np.array(SHAPES[grid_type], dtype=np.int64)[:, None] >> np.arange(fan_size)
+    return (1 - (removed & 1)).astype(np.uint8)
+
+
+def merge_kept_cells(grid_type, fan_size, center_shapes):
+    # One bitmask per center for several selections of the same lattice: the cells kept by any of
+    # them (bit n is the n-th cell of the fan), -1 where none selects the center. Every shape keeps
+    # at least one cell, so a selected center never ends up as 0.
+    kept_bits = (shape_keep_table(grid_type, fan_size).astype(np.int64) << np.arange(fan_size)).sum(axis=1)
+    merged = np.zeros(center_shapes[0].shape, dtype=np.int64)
+    for shapes in center_shapes:
+        selected = shapes >= 0
+        merged[selected] |= kept_bits[shapes[selected]]
+    merged[merged == 0] = -1
+    return merged
+
+
+# Exported polygons of every quad shape, as indices into the flattened fan of the center
+# (the 12 vertex ids of its left, bottom, top and right triangles). A shape exports the outline
+# of the cells it keeps, clockwise: the full square, a corner triangle or the one kept triangle.
+#   0: c  1: p01  2: p00 | 3: c  4: p00  5: p10 | 6: c  7: p11  8: p01 | 9: c  10: p10  11: p11
+QUAD_FACES = (
+    ((7, 5, 2, 1),),
+    ((7, 5, 1),),
+    ((7, 5, 2),),
+    ((5, 2, 1),),
+    ((7, 2, 1),),
+    ((7, 5, 0),),
+    ((5, 2, 0),),
+    ((0, 2, 1),),
+    ((7, 0, 1),),
+)
+
+
+def shape_face_table(grid_type, fan_size):
+    # faces[shape] lists the exported polygons of a center with that shape. Hexagon shapes
+    # export their kept triangles as they are.
+    if grid_type == 0:
+        return QUAD_FACES
+    keep = shape_keep_table(grid_type, fan_size)
+    return tuple(tuple((3 * n, 3 * n + 1, 3 * n + 2) for n in np.flatnonzero(row)) for row in keep)
+
+
+def kept_cells_face_table(grid_type, fan_size):
+    # faces[bits] lists the exported polygons of a center keeping the cells in bitmask bits (see
+    # merge_kept_cells): the faces of the shape keeping exactly those cells, else every kept
+    # triangle on its own, turned like the faces of the shapes (quad faces run clockwise).
+    faces = shape_face_table(grid_type, fan_size)
+    keep = shape_keep_table(grid_type, fan_size).astype(np.int64)
+    shape_of_bits = {int(bits): shape for shape, bits in enumerate((keep << np.arange(fan_size)).sum(axis=1))}
+    triangle = (0, 2, 1) if grid_type == 0 else (0, 1, 2)
+    table = []
+    for bits in range(1 << fan_size):
+        if bits in shape_of_bits:
+            table.append(faces[shape_of_bits[bits]])
+        else:
+            table.append(tuple(tuple(3 * n + k for k in triangle) for n in range(fan_size) if bits >> n & 1))
+    return tuple(table)
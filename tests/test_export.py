@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from export import ExportSnapshot, MergedSnapshot
+from lattice import HexagonLattice, QuadLattice
+from meshing import points_in_polygon
+from shapes import SHAPES, shape_keep_table
+
+
+@pytest.mark.parametrize('grid_type, lattice_class', [(0, QuadLattice), (1, HexagonLattice)], ids=['quad', 'hexagon'])
+def test_merged_mesh_exports_the_union_of_kept_cells(grid_type, lattice_class):
+    # every pair of shapes on one center: inside the merged mesh are exactly the cells either keeps
+    lattice = lattice_class(6)
+    keep = shape_keep_table(grid_type, lattice.fan_size)
+    center = lattice.num_centers // 2
+    triangles = lattice.points[lattice.triangles.reshape(lattice.num_centers, -1, 3)[center], :2].astype(np.float64)
+    samples = np.random.default_rng(0).dirichlet([1, 1, 1], 20) @ triangles
+    for first in range(len(SHAPES[grid_type])):
+        for second in range(len(SHAPES[grid_type])):
+            snapshots = []
+            for shape in (first, second):
+                center_shapes = np.full(lattice.num_centers, -1, dtype=np.int8)
+                center_shapes[center] = shape
+                snapshots.append(ExportSnapshot(lattice, grid_type, 0, center_shapes, []))
+            points, offsets, connectivity = MergedSnapshot(snapshots).build_mesh()
+            inside = np.zeros(samples.shape[:2], dtype=bool)
+            for start, end in zip(offsets[:-1], offsets[1:]):
+                polygon = points[connectivity[start:end], :2].astype(np.float64)
+                inside |= points_in_polygon(samples[..., 0].ravel(), samples[..., 1].ravel(),
+                                            polygon).reshape(inside.shape)
+            expected = np.repeat((keep[first] | keep[second]).astype(bool)[:, None], samples.shape[1], axis=1)
+            assert inside.tolist() == expected.tolist(), (first, second)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from lattice import HexagonLattice, QuadLattice
+
+
+def random_points(rng, lattice, count, margin=1.0):
+    low = lattice.points[:, :2].min(axis=0) - margin
+    high = lattice.points[:, :2].max(axis=0) + margin
+    return rng.uniform(low, high, (count, 2)).T
+
+
+def reference_center(lattice, x, y):
+    # the center whose fan has a triangle around (x, y), -1 for none
+    corners = lattice.points[lattice.triangles, :2].astype(np.float64)
+    a, b, c = corners[:, 0], corners[:, 1], corners[:, 2]
+    result = []
+    for px, py in zip(x, y):
+        sides = [(v[:, 0] - u[:, 0]) * (py - u[:, 1]) - (v[:, 1] - u[:, 1]) * (px - u[:, 0])
+                 for u, v in ((a, b), (b, c), (c, a))]
+        inside = ((sides[0] >= 0) & (sides[1] >= 0) & (sides[2] >= 0)) | \
+                 ((sides[0] <= 0) & (sides[1] <= 0) & (sides[2] <= 0))
+        triangles = np.flatnonzero(inside)
+        result.append(lattice.num_nodes + triangles[0] // lattice.fan_size if triangles.size else -1)
+    return result
+
+
+@pytest.fixture(params=[QuadLattice, HexagonLattice], ids=['quad', 'hexagon'])
+def lattice(request):
+    return request.param(10)
+
+
+def test_locate_center(lattice):
+    rng = np.random.default_rng(1)
+    x, y = random_points(rng, lattice, 2000)
+    assert lattice.locate_center(x, y).tolist() == reference_center(lattice, x, y)
+
+
+@pytest.mark.parametrize('tolerance', [0.05, 0.3, 2.0])
+def test_locate_point(lattice, tolerance):
+    rng = np.random.default_rng(2)
+    x, y = random_points(rng, lattice, 2000, margin=0.0)
+    points = lattice.points[:, :2].astype(np.float64)
+    expected = []
+    for px, py in zip(x, y):
+        nearest = int(np.argmin(np.hypot(points[:, 0] - px, points[:, 1] - py)))
+        near = max(abs(points[nearest, 0] - px), abs(points[nearest, 1] - py)) <= tolerance
+        expected.append(nearest if near else -1)
+    assert lattice.locate_point(x, y, tolerance).tolist() == expected
+
+
+def test_points_in_box(lattice):
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        xmin, xmax = np.sort(rng.uniform(-2, lattice.points[:, 0].max() + 2, 2))
+        ymin, ymax = np.sort(rng.uniform(-2, lattice.points[:, 1].max() + 2, 2))
+        x, y = lattice.points[:, 0], lattice.points[:, 1]
+        expected = np.flatnonzero((x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax))
+        assert np.sort(lattice.points_in_box(xmin, ymin, xmax, ymax)).tolist() == expected.tolist()
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from lattice import HexagonLattice, QuadLattice
+from meshing import points_in_polygon
+
+
+def segment_distance(px, py, x0, y0, x1, y1):
+    dx, dy = x1 - x0, y1 - y0
+    t = 0.0 if dx == dy == 0 else min(max(((px - x0) * dx + (py - y0) * dy) / (dx * dx + dy * dy), 0.0), 1.0)
+    return np.hypot(px - x0 - t * dx, py - y0 - t * dy)
+
+
+def reference_inside(px, py, polygon, tolerance):
+    # one point against every edge: on the outline, or an odd number of crossings to its left
+    crossings = 0
+    for (x0, y0), (x1, y1) in zip(polygon, np.roll(polygon, -1, axis=0)):
+        if segment_distance(px, py, x0, y0, x1, y1) <= tolerance:
+            return True
+        if (y0 > py) != (y1 > py) and x0 + (py - y0) / (y1 - y0) * (x1 - x0) < px:
+            crossings += 1
+    return crossings % 2 == 1
+
+
+def random_polygon(rng, lattice, size):
+    # a star shaped polygon through lattice points around the middle of the grid
+    points = lattice.points[:, :2].astype(np.float64)
+    middle = points.mean(axis=0)
+    radius = rng.uniform(0.1, 0.45, size) * np.ptp(points, axis=0).min()
+    angle = np.sort(rng.uniform(0, 2 * np.pi, size))
+    targets = middle + radius[:, None] * np.column_stack((np.cos(angle), np.sin(angle)))
+    ids = [int(np.argmin(np.hypot(*(points - target).T))) for target in targets]
+    ids = [point_id for n, point_id in enumerate(ids) if point_id != ids[n - 1]]
+    return points[ids]
+
+
+@pytest.mark.parametrize('lattice_class', [QuadLattice, HexagonLattice])
+@pytest.mark.parametrize('seed', range(5))
+def test_points_in_polygon_lattice_points(lattice_class, seed):
+    # polygons through lattice points as drawn in node mode, with points exactly on the outline
+    rng = np.random.default_rng(seed)
+    lattice = lattice_class(12)
+    polygon = random_polygon(rng, lattice, rng.integers(3, 12))
+    x = lattice.points[:, 0].astype(np.float64)
+    y = lattice.points[:, 1].astype(np.float64)
+    expected = [reference_inside(px, py, polygon, 1e-4) for px, py in zip(x, y)]
+    assert points_in_polygon(x, y, polygon).tolist() == expected
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_points_in_polygon_random_points(seed):
+    rng = np.random.default_rng(seed)
+    polygon = rng.uniform(0, 10, (rng.integers(3, 15), 2))
+    x, y = rng.uniform(-1, 11, (2, 2000))
+    # away from the outline, where only the even-odd rule decides
+    distance = np.array([min(segment_distance(px, py, *a, *b) for a, b in zip(polygon, np.roll(polygon, -1, axis=0)))
+                         for px, py in zip(x, y)])
+    x, y = x[distance > 1e-3], y[distance > 1e-3]
+    expected = [reference_inside(px, py, polygon, 1e-4) for px, py in zip(x, y)]
+    assert points_in_polygon(x, y, polygon).tolist() == expected
+
+
+def test_points_in_polygon_shared_rows():
+    # points on the rows of vertices and horizontal edges
+    polygon = np.array([[0, 0], [4, 0], [4, 2], [2, 2], [2, 4], [0, 4]], dtype=np.float64)
+    x, y = np.meshgrid(np.arange(-1, 6, 0.5), np.arange(-1, 6, 0.5))
+    expected = [reference_inside(px, py, polygon, 1e-4) for px, py in zip(x.ravel(), y.ravel())]
+    assert points_in_polygon(x.ravel(), y.ravel(), polygon).tolist() == expected
@@ -0,0 +1,61 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from lattice import HexagonLattice, QuadLattice
+from selectionops import fill_holes, flood_fill, label_components, neighbor_index
+
+
+def reference_components(mask, neighbors):
+    # breadth first search from every unlabelled center, labels are the smallest member
+    labels = np.full(mask.size, -1)
+    for start in range(mask.size):
+        if not mask[start] or labels[start] >= 0:
+            continue
+        labels[start] = start
+        queue = deque([start])
+        while queue:
+            center = queue.popleft()
+            for neighbor in neighbors[center]:
+                if neighbor < mask.size and mask[neighbor] and labels[neighbor] < 0:
+                    labels[neighbor] = start
+                    queue.append(neighbor)
+    return labels
+
+
+@pytest.fixture(params=[QuadLattice, HexagonLattice], ids=['quad', 'hexagon'])
+def neighbors(request):
+    return neighbor_index(request.param(16))
+
+
+def random_masks(neighbors):
+    rng = np.random.default_rng(4)
+    size = neighbors.shape[0]
+    for density in (0.0, 0.2, 0.45, 0.55, 0.8, 1.0):
+        yield rng.random(size) < density
+    # a long winding component, the worst case for propagating labels
+    yield np.arange(size) % 7 != 3
+
+
+def test_label_components(neighbors):
+    for mask in random_masks(neighbors):
+        assert label_components(mask, neighbors).tolist() == reference_components(mask, neighbors).tolist()
+
+
+def test_flood_fill(neighbors):
+    rng = np.random.default_rng(5)
+    for mask in random_masks(neighbors):
+        for seed in rng.integers(0, mask.size, 5).tolist():
+            labels = reference_components(mask == mask[seed], neighbors)
+            expected = labels == labels[seed]
+            assert flood_fill(mask, neighbors, seed).tolist() == expected.tolist()
+
+
+def test_fill_holes(neighbors):
+    for mask in random_masks(neighbors):
+        labels = reference_components(~mask, neighbors)
+        edge = (neighbors == mask.size).any(axis=1)
+        open_labels = set(labels[edge & ~mask].tolist())
+        expected = mask | np.array([label >= 0 and label not in open_labels for label in labels.tolist()])
+        assert fill_holes(mask, neighbors).tolist() == expected.tolist()
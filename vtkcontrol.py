@@ -1,603 +1,610 @@
 import vtkmodules.vtkRenderingOpenGL2
 from vtkmodules.vtkCommonColor import vtkNamedColors
-from vtkmodules.vtkCommonCore import (
-    vtkIdTypeArray,
-    vtkPoints,
-    vtkIdList
-)
-from vtkmodules.vtkCommonDataModel import (
-    vtkSelection,
-    vtkSelectionNode,
-    vtkUnstructuredGrid,
-    vtkPolyData,
-    vtkPolyLine,
-    vtkCellArray,
-    vtkPolygon
-)
-from vtkmodules.vtkFiltersCore import vtkDelaunay2D
-from vtkmodules.vtkFiltersGeometry import vtkDataSetSurfaceFilter
-from vtkmodules.vtkFiltersExtraction import vtkExtractSelection
-from vtkmodules.vtkFiltersModeling import vtkSelectEnclosedPoints
+from vtkmodules.util.numpy_support import numpy_to_vtk
+from vtkmodules.vtkCommonCore import vtkLookupTable, vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkPolyData, vtkStaticCellLocator
 
 from vtkmodules.vtkRenderingCore import (
     vtkActor,
+    vtkActor2D,
     vtkDataSetMapper,
-    vtkPolyDataMapper,
+    vtkPolyDataMapper2D,
     vtkRenderer
 )
-from vtkmodules.vtkIOPLY import (
-    vtkPLYWriter
-)
 
-from Constant import GRID_SIZE
-from MouseInteractorStyle import MouseInteractorStyle
+from Constant import GRID_SIZE, LATTICE_PICKING, RENDER_INTERVAL
+from gridcache import GridCache
+from gridview import GridView, make_grid_actor, make_line_actor
+from history import History, ShapeDelta, PolygonEdit, PolygonReplace
+from instrument import traced, watch_render_window, make_overlay
+from export import ExportSnapshot, MergedSnapshot
+from lattice import make_cell_array
+from layers import LAYER_COLORS, SelectionLayer, unique_layer_name
+from meshing import regenerate_mesh, mesh_to_unstructured_grid, points_in_polygon
+from selectionops import SET_OPERATIONS, dilate, erode, fill_holes, flood_fill, invert, neighbor_index
+from session import read_session, write_session
+from shapes import shape_keep_table
+from MouseInteractorStyle import MouseInteractorStyle, display_to_world
 from MouseInteractorStyle2 import MouseInteractorStyle2
 
-import math
-
+import numpy as np
 
-def set_to_id_type_array(cell_set):
-    arr = vtkIdTypeArray()
-    for cell in cell_set:
-        arr.InsertNextValue(cell)
-    return arr
+try:
+    from PyQt6.QtCore import QObject, QTimer
+except ImportError:
+    QObject = QTimer = None  # renders synchronously without Qt
 
 
 class VTKControl:
-    def __init__(self, parent):
-        if parent is None:
-            return
+    def __init__(self, parent=None, grid_size=GRID_SIZE, deferred=False):
+        # Without a parent widget the control runs headless: there is no render window or
+        # interactor, and everything but drawing (selection, shapes, export) works the same.
+        # A deferred control builds no grid until start(), so the window can be shown first.
         self.ren = vtkRenderer()
-        self.ren_win = parent.GetRenderWindow()
-        self.ren_win.AddRenderer(self.ren)
-        self.iren = self.ren_win.GetInteractor()
+        self.ren_win = None
+        self.iren = None
+        if parent is not None:
+            self.ren_win = parent.GetRenderWindow()
+            self.ren_win.AddRenderer(self.ren)
+            self.iren = self.ren_win.GetInteractor()
+            watch_render_window(self.ren_win)
+        # frame rate / latency text, only with tracing and its overlay enabled
+        self.overlay = make_overlay(self.ren_win)
+        # Edits only mark the view dirty, a single shot timer then draws everything that changed
+        # in between with one render. Without a Qt parent (offscreen, headless) render() draws at once.
+        self.render_timer = None
+        if QObject is not None and isinstance(parent, QObject):
+            self.render_timer = QTimer(parent)
+            self.render_timer.setSingleShot(True)
+            self.render_timer.setInterval(RENDER_INTERVAL)
+            self.render_timer.timeout.connect(self.flush)
+        self.cells_modified = False
+        self.polygon_modified = False
+        self.grid_size = grid_size
         self.colors = vtkNamedColors()
 
+        # the center fan triangles, which hold the selection and are picked; the lines are drawn apart
         self.grid_data = vtkPolyData()
-
-        self.selection_node = vtkSelectionNode()
-        self.selection = vtkSelection()
-        self.extract_selection = vtkExtractSelection()
-        self.select_cell_point_ids = {}
-        self.select_cell_ids = set()
-        self.select_point_ids = []
+        # prebuilt cell locator of grid_data for ray cast picking, without LATTICE_PICKING only
+        self.grid_locator = None
+        # what draws the grid, with level of detail (see gridview.py)
+        self.grid_view = None
+        self.ren.AddObserver('StartEvent', self.update_grid_view)
+
+        # named selection layers on the grid, the one being edited is self.layer (see layers.py)
+        self.layers = []
+        self.layer = None
+        # The selection state below is the one of the active layer, set by activate_layer().
+        self.node_polygon = None
+        # shape code of every center, -1 for centers that are not selected
+        self.center_shapes = np.zeros(0, dtype=np.int8)
+        self.shape_table = None
+        # selection state as one byte per cell / point, shared with VTK as the 'Selected' arrays
+        self.cell_mask = np.zeros(0, dtype=np.uint8)
+        self.point_mask = np.zeros(0, dtype=np.uint8)
+        self.cell_mask_array = None
+        self.point_mask_array = None
         self.center_points = set()
+        self.lattice = None
+        # center_neighbors for selectionops, built on first use
+        self.neighbors = None
+        # a selection kept aside to combine with the current one
+        self.stored_selection = None
+        self.grid_cache = GridCache()
+        self.history = History()
         self.selected_node_polydata = vtkPolyData()
-        self.selected_mapper = vtkDataSetMapper()
-        self.selected_actor = vtkActor()
+        self.grid_lookup_table = vtkLookupTable()
         self.selected_polygon_mapper = vtkDataSetMapper()
         self.selected_polygon_actor = vtkActor()
+        # box / lasso rubber band, drawn in display coordinates
+        self.selection_tool = 'paint'
+        self.interactor_style = None
+        self.band_data = vtkPolyData()
+        self.band_mapper = vtkPolyDataMapper2D()
+        self.band_mapper.SetInputData(self.band_data)
+        self.band_actor = vtkActor2D()
+        self.band_actor.SetMapper(self.band_mapper)
+        self.band_actor.GetProperty().SetColor(self.colors.GetColor3d('Black'))
+        self.band_actor.VisibilityOff()
 
         self.context_pass_point_id = 0
         self.context_menu_count = 0
 
-        self.iren.SetRenderWindow(self.ren_win)
+        # The grid colors itself by its 'Selected' cell array: 0 is the grid, 1 is a selected cell.
+        self.grid_lookup_table.SetNumberOfTableValues(2)
+        self.grid_lookup_table.SetTableRange(0, 1)
+        self.grid_lookup_table.SetTableValue(0, *self.colors.GetColor3d('Black'), 0.3)
+        self.set_selection_color('Plum')
 
-        self.iren.Initialize()
+        if self.iren is not None:
+            self.iren.SetRenderWindow(self.ren_win)
+            self.iren.Initialize()
         self.current_interactor_style = 0
         self.current_grid_type = 0
 
-        self.init_view(self.current_grid_type, self.current_interactor_style)
-
         self.ren.SetBackground(self.colors.GetColor3d('PaleGreen'))
+        if not deferred:
+            self.start()
+
+    def start(self):
+        # the first view, with the camera fitted to the grid
+        self.init_view(self.current_grid_type, self.current_interactor_style)
         self.ren.GetActiveCamera().ParallelProjectionOn()
         self.ren.ResetCamera()
         self.ren.GetActiveCamera().Zoom(10)
+        self.flush()
+
+    def render(self):
+        if self.render_timer is None:
+            self.flush()
+        elif not self.render_timer.isActive():
+            self.render_timer.start()
+
+    @traced
+    def flush(self):
+        # the Modified() calls of all edits since the last frame, then the frame itself
+        if self.render_timer is not None:
+            self.render_timer.stop()
+        if self.cells_modified:
+            self.cells_modified = False
+            self.cell_mask_array.Modified()
+            if self.grid_view is not None:
+                self.grid_view.modified()
+        if self.polygon_modified:
+            self.polygon_modified = False
+            self.point_mask_array.Modified()
+            self.selected_node_polydata.Modified()
+        if self.ren_win is not None:
+            self.ren_win.Render()
+
+    def update_grid_view(self, obj, event):
+        if self.grid_view is not None:
+            self.grid_view.update(self.cell_mask, self.center_shapes)
 
-        self.ren_win.Render()
+    def max_parallel_scale(self):
+        # zoomed out until the whole grid fits twice into the view
+        extent = self.lattice.points[:, :2].max(axis=0) - self.lattice.points[:, :2].min(axis=0)
+        return float(extent.max())
 
     def reset_member_variables(self):
-        self.select_cell_point_ids.clear()
-        self.select_cell_ids.clear()
-        self.select_point_ids.clear()
-
-        self.selection = vtkSelection()
-        self.selection_node = vtkSelectionNode()
-        self.selection_node.SetContentType(vtkSelectionNode.INDICES)
-        self.selection_node.SetFieldType(vtkSelectionNode.CELL)
-
-        self.selection.AddNode(self.selection_node)
-        self.extract_selection.SetInputData(0, self.grid_data)
-        self.extract_selection.SetInputData(1, self.selection)
-        self.extract_selection.Update()
+        self.node_polygon = None
         self.selected_node_polydata = vtkPolyData()
 
-        self.selected_mapper.SetInputConnection(self.extract_selection.GetOutputPort())
-
-        self.selected_actor.SetMapper(self.selected_mapper)
-        self.selected_actor.GetProperty().EdgeVisibilityOff()
-        self.selected_actor.GetProperty().SetColor(self.colors.GetColor3d('Plum'))
-
+    @traced
     def init_view(self, grid_type, interactor_style):
         self.current_grid_type = grid_type
         self.current_interactor_style = interactor_style
         self.ren.RemoveAllViewProps()
         self.reset_member_variables()
+        self.history.clear()
 
         if grid_type == 0:
             self.init_quad_grid()
         elif grid_type == 1:
             self.init_hexagon_grid()
+        self.init_selection_mask()
+        self.band_actor.VisibilityOff()
+        self.ren.AddViewProp(self.band_actor)
+        if self.overlay is not None:
+            self.ren.AddViewProp(self.overlay.actor)
+
+        if self.iren is not None:
+            self.init_interactor_style(interactor_style)
 
+        self.render()
+
+    def init_interactor_style(self, interactor_style):
         if interactor_style == 0:  # Mesh
-            self.selection_node.SetFieldType(vtkSelectionNode.CELL)
-            self.selected_actor.GetProperty().RenderPointsAsSpheresOff()
-            self.selected_actor.GetProperty().SetPointSize(1.0)
-            style = MouseInteractorStyle(self.grid_data, self.select_mesh_callback, self.get_right_click_callback, self.center_points)
+            style = MouseInteractorStyle(self.grid_data, self.select_mesh_callback, self.get_right_click_callback,
+                                         self.center_points, self.lattice if LATTICE_PICKING else None,
+                                         self.stroke_callback, self.region_callback, self.fill_callback)
+            style.tool = self.selection_tool
+            if self.grid_locator is not None:
+                style.picker.AddLocator(self.grid_locator)
+            style.max_scale = self.max_parallel_scale()
             style.SetDefaultRenderer(self.ren)
             self.iren.SetInteractorStyle(style)
+            self.interactor_style = style
         elif interactor_style == 1:  # Node
-            self.selection_node.SetFieldType(vtkSelectionNode.POINT)
-            self.selected_actor.GetProperty().RenderPointsAsSpheresOn()
-            self.selected_actor.GetProperty().SetPointSize(10.0)
-            style = MouseInteractorStyle2(self.select_point_callback, self.get_right_click_callback)
+            style = MouseInteractorStyle2(self.select_point_callback, self.get_right_click_callback,
+                                          self.lattice if LATTICE_PICKING else None,
+                                          self.insert_point_callback, self.move_point_callback,
+                                          self.is_polygon_point, self.stroke_callback)
+            style.max_scale = self.max_parallel_scale()
             style.SetDefaultRenderer(self.ren)
             self.iren.SetInteractorStyle(style)
+            self.interactor_style = style
+
+    def set_selection_tool(self, tool):
+        # 'paint', 'box' or 'lasso', used by Mesh mode
+        self.selection_tool = tool
+        if isinstance(self.interactor_style, MouseInteractorStyle):
+            self.interactor_style.tool = tool
+
+    def init_selection_mask(self):
+        self.neighbors = None
+        self.stored_selection = None
+        self.shape_table = shape_keep_table(self.current_grid_type, self.lattice.fan_size)
+        self.layers = []
+        self.activate_layer(self.create_layer())
+
+    def set_selection_color(self, color):
+        # Selected cells keep the look of the color under the translucent black grid.
+        rgb = self.colors.GetColor3d(color)
+        self.grid_lookup_table.SetTableValue(1, rgb[0] * 0.7, rgb[1] * 0.7, rgb[2] * 0.7, 1.0)
+        self.grid_lookup_table.Build()
+        self.selected_polygon_actor.GetProperty().SetColor(rgb)
+
+    def create_layer(self, name=None):
+        name = unique_layer_name(self.layers, name or 'Layer %d' % (len(self.layers) + 1))
+        layer = SelectionLayer(name, LAYER_COLORS[len(self.layers) % len(LAYER_COLORS)], self.lattice,
+                               self.grid_data.GetNumberOfCells())
+        self.layers.append(layer)
+        return layer
+
+    def add_layer(self, name=None):
+        # a new empty layer, which becomes the active one
+        layer = self.create_layer(name)
+        self.activate_layer(layer)
+        self.render()
+        return layer
+
+    def remove_layer(self, index):
+        # the last layer is kept, removing the active layer activates the one before it
+        if len(self.layers) < 2:
+            return False
+        layer = self.layers.pop(index)
+        if layer is self.layer:
+            self.activate_layer(self.layers[max(index - 1, 0)])
+            self.render()
+        return True
 
-        self.ren_win.Render()
-
+    def rename_layer(self, index, name):
+        others = self.layers[:index] + self.layers[index + 1:]
+        self.layers[index].name = unique_layer_name(others, name)
+        return self.layers[index].name
+
+    def set_active_layer(self, index):
+        if self.layers[index] is not self.layer:
+            self.activate_layer(self.layers[index])
+            self.render()
+
+    def activate_layer(self, layer):
+        # Switches editing and drawing to layer. Nothing is copied: the VTK arrays wrap the masks
+        # of the layer, so updates only need a Modified(), and replace the previous layer's arrays.
+        self.history.end_group()
+        self.layer = layer
+        self.center_shapes = layer.center_shapes
+        self.cell_mask = layer.cell_mask
+        self.point_mask = layer.point_mask
+        self.node_polygon = layer.node_polygon
+        self.history = layer.history
+
+        self.cell_mask_array = numpy_to_vtk(self.cell_mask)
+        self.cell_mask_array.SetName('Selected')
+        self.grid_data.GetCellData().AddArray(self.cell_mask_array)
+        self.point_mask_array = numpy_to_vtk(self.point_mask)
+        self.point_mask_array.SetName('Selected')
+        self.grid_data.GetPointData().AddArray(self.point_mask_array)
+
+        self.selected_node_polydata.SetPolys(self.node_polygon.polys)
+        self.selected_node_polydata.SetVerts(self.node_polygon.verts)
+        self.set_selection_color(layer.color)
+        self.cells_modified = True
+        self.polygon_modified = True
+
+    def is_center_selected(self, point_id):
+        return self.center_shapes[point_id - self.lattice.num_nodes] >= 0
+
+    @traced
     def select_mesh_callback(self, point_id, remove_mode):
-        # select_ids.add(id)
+        index = point_id - self.lattice.num_nodes
+        if remove_mode == (self.center_shapes[index] >= 0):
+            self.edit_center_shapes(np.array([index]), np.array([-1 if remove_mode else 0], dtype=np.int8))
+
+    @traced
+    def select_centers(self, point_ids, remove_mode=False):
+        # selects (shape 0) or removes every center in point_ids in one pass
+        index = np.unique(np.asarray(point_ids, dtype=np.int64).reshape(-1) - self.lattice.num_nodes)
         if remove_mode:
-            if point_id in self.select_cell_point_ids:
-                del self.select_cell_point_ids[point_id]
-                cl = vtkIdList()
-                self.grid_data.GetPointCells(point_id, cl)
-                for idx in range(cl.GetNumberOfIds()):
-                    if cl.GetId(idx) in self.select_cell_ids:
-                        self.select_cell_ids.remove(cl.GetId(idx))
-                self.selection_node.SetSelectionList(set_to_id_type_array(self.select_cell_ids))
+            index = index[self.center_shapes[index] >= 0]
         else:
-            if point_id not in self.select_cell_point_ids:
-                self.select_cell_point_ids[point_id] = 0
-                # selected_ids = vtkIdTypeArray()
-                cl = vtkIdList()
-                self.grid_data.GetPointCells(point_id, cl)
-                for idx in range(cl.GetNumberOfIds()):
-                    self.select_cell_ids.add(cl.GetId(idx))
-                self.selection_node.SetSelectionList(set_to_id_type_array(self.select_cell_ids))
-        self.ren_win.Render()
+            index = index[self.center_shapes[index] < 0]
+        if index.size == 0:
+            return False
+        self.edit_center_shapes(index, np.full(index.size, -1 if remove_mode else 0, dtype=np.int8))
+        return True
+
+    @traced
+    def select_region(self, polygon, remove_mode=False):
+        # Selects or removes the centers inside the polygon (n x 2 world coordinates). The
+        # candidates are the centers of its bounding box, found by lattice arithmetic.
+        polygon = np.asarray(polygon, dtype=np.float64)
+        candidates = self.lattice.points_in_box(*polygon.min(axis=0), *polygon.max(axis=0))
+        candidates = candidates[candidates >= self.lattice.num_nodes]
+        if candidates.size == 0:
+            return False
+        points = self.lattice.points[candidates].astype(np.float64)
+        return self.select_centers(candidates[points_in_polygon(points[:, 0], points[:, 1], polygon)], remove_mode)
+
+    def region_callback(self, outline, remove_mode, finished):
+        # outline of a box or lasso drag in display coordinates
+        if not finished:
+            self.show_band(outline)
+            self.render()
+            return
+        self.band_actor.VisibilityOff()
+        # a changed selection renders anyway
+        if len(outline) < 3 or not self.select_region([display_to_world(self.ren, x, y) for x, y in outline],
+                                                      remove_mode):
+            self.render()
+
+    def show_band(self, outline):
+        points = np.zeros((len(outline), 3))
+        points[:, :2] = outline
+        band_points = vtkPoints()
+        band_points.SetData(numpy_to_vtk(points, deep=1))
+        # one closed polyline through the outline
+        connectivity = np.append(np.arange(len(outline), dtype=np.int64), 0)
+        self.band_data.SetPoints(band_points)
+        self.band_data.SetLines(make_cell_array(np.array([0, connectivity.size], dtype=np.int64), connectivity))
+        self.band_actor.VisibilityOn()
+
+    def get_neighbors(self):
+        if self.neighbors is None:
+            self.neighbors = neighbor_index(self.lattice)
+        return self.neighbors
+
+    def selection(self):
+        # one flag per center
+        return self.center_shapes >= 0
+
+    def set_selection(self, mask):
+        # Replaces the selection of Mesh mode by mask as one undoable edit. Centers that stay
+        # selected keep their shape, newly selected ones get shape 0.
+        if self.current_interactor_style != 0:
+            return False
+        index = np.flatnonzero(mask != self.selection())
+        if index.size == 0:
+            return False
+        self.edit_center_shapes(index, np.where(mask[index], 0, -1).astype(np.int8))
+        return True
+
+    @traced
+    def grow_selection(self):
+        self.set_selection(dilate(self.selection(), self.get_neighbors()))
+
+    @traced
+    def shrink_selection(self):
+        self.set_selection(erode(self.selection(), self.get_neighbors()))
 
+    @traced
+    def invert_selection(self):
+        self.set_selection(invert(self.selection()))
+
+    @traced
+    def fill_selection_holes(self):
+        self.set_selection(fill_holes(self.selection(), self.get_neighbors()))
+
+    @traced
+    def fill_callback(self, point_id, remove_mode):
+        # selects the unselected region around point_id, or removes the selected one with remove_mode
+        selection = self.selection()
+        index = point_id - self.lattice.num_nodes
+        if selection[index] != remove_mode:
+            return
+        region = flood_fill(selection, self.get_neighbors(), index)
+        self.set_selection(selection & ~region if remove_mode else selection | region)
+
+    def store_selection(self):
+        self.stored_selection = self.selection()
+
+    @traced
+    def combine_stored_selection(self, operation):
+        # 'union', 'intersection' or 'difference' of the current and the stored selection
+        if self.stored_selection is not None:
+            self.set_selection(SET_OPERATIONS[operation](self.selection(), self.stored_selection))
+
+    def set_center_shapes(self, index, shapes):
+        # writes the shape codes of the centers at index and selects the cells they keep
+        self.center_shapes[index] = shapes
+        keep = self.shape_table[np.maximum(shapes, 0)] * (shapes >= 0)[:, None].astype(np.uint8)
+        self.cell_mask.reshape(-1, self.lattice.fan_size)[index] = keep
+        self.cells_modified = True
+
+    def edit_center_shapes(self, index, shapes):
+        # set_center_shapes() as one undoable edit
+        self.history.record(ShapeDelta(index, self.center_shapes[index], shapes))
+        self.set_center_shapes(index, shapes)
+        self.render()
+
+    @traced
     def select_point_callback(self, point_id, remove_mode):
-        if point_id not in self.center_points:
-            if remove_mode:
-                if point_id in self.select_point_ids:
-                    self.select_point_ids.remove(point_id)
-            else:
-                if point_id not in self.select_point_ids:
-                    self.select_point_ids.append(point_id)
-
-        select_ids = vtkIdTypeArray()
-        polygon = vtkPolygon()
-        for pid in self.select_point_ids:
-            select_ids.InsertNextValue(pid)
-            polygon.GetPointIds().InsertNextId(pid)
-        polygon_ca = vtkCellArray()
-        polygon_ca.InsertNextCell(polygon)
-        self.selection_node.SetSelectionList(select_ids)
-        self.selected_node_polydata.SetPolys(polygon_ca)
-
-        self.ren_win.Render()
+        if point_id in self.center_points:
+            return
+        if remove_mode:
+            position = self.node_polygon.remove(point_id)
+            operation = 'remove'
+        else:
+            position = self.node_polygon.append(point_id)
+            operation = 'insert'
+        if position >= 0:
+            self.history.record(PolygonEdit(operation, position, point_id))
+            self.node_polygon_modified()
+
+    @traced
+    def insert_point_callback(self, point_id):
+        if point_id in self.center_points:
+            return
+        position = self.node_polygon.insert_nearest(point_id)
+        if position >= 0:
+            self.history.record(PolygonEdit('insert', position, point_id))
+            self.node_polygon_modified()
+
+    @traced
+    def move_point_callback(self, point_id, new_point_id):
+        # the position of the moved vertex, -1 when it did not move
+        if new_point_id in self.center_points:
+            return -1
+        position = self.node_polygon.move(point_id, new_point_id)
+        if position >= 0:
+            self.history.record(PolygonEdit('move', position, point_id, new_point_id))
+            self.node_polygon_modified()
+        return position
+
+    @traced
+    def set_node_polygon(self, point_ids):
+        # replaces the node polygon, centers and repeated ids are left out
+        point_ids = np.asarray(point_ids, dtype=np.int64).reshape(-1)
+        before = self.node_polygon.ids.copy()
+        self.node_polygon.assign(point_ids[point_ids < self.lattice.num_nodes])
+        self.history.record(PolygonReplace(before, self.node_polygon.ids.copy()))
+        self.node_polygon_modified()
+
+    def stroke_callback(self, active):
+        # everything painted or dragged between press and release is undone as one edit
+        if active:
+            self.history.begin_group()
+        else:
+            self.history.end_group()
+
+    @traced
+    def undo(self):
+        if self.history.undo(self):
+            self.render()
+
+    @traced
+    def redo(self):
+        if self.history.redo(self):
+            self.render()
+
+    def is_polygon_point(self, point_id):
+        return point_id in self.node_polygon
 
+    def node_polygon_modified(self):
+        self.polygon_modified = True
+        self.render()
+
+    @traced
     def change_mesh(self, point_id, shape):
-        if point_id in self.select_cell_point_ids:
-            self.select_cell_point_ids[point_id] = shape % (9 if self.current_grid_type == 0 else 19 if self.current_grid_type == 1 else -1)
-            cl = vtkIdList()
-            self.grid_data.GetPointCells(point_id, cl)
-            cell_bounds_center = {}
-            for idx in range(cl.GetNumberOfIds()):
-                self.select_cell_ids.add(cl.GetId(idx))
-                bounds = self.grid_data.GetCell(cl.GetId(idx)).GetBounds()
-                bounds_center = [bounds[0] + ((bounds[1] - bounds[0]) / 2),
-                                 bounds[2] + ((bounds[3] - bounds[2]) / 2)]
-                cell_bounds_center[idx] = bounds_center
-            cell_bounds_center = sorted(cell_bounds_center.items(), key=lambda item: item[1])
-            cell_remove = []
-            if self.current_grid_type == 0:
-                if self.select_cell_point_ids[point_id] == 1:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                elif self.select_cell_point_ids[point_id] == 2:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                elif self.select_cell_point_ids[point_id] == 3:
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                elif self.select_cell_point_ids[point_id] == 4:
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                elif self.select_cell_point_ids[point_id] == 5:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                elif self.select_cell_point_ids[point_id] == 6:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                elif self.select_cell_point_ids[point_id] == 7:
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                elif self.select_cell_point_ids[point_id] == 8:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-            elif self.current_grid_type == 1:
-                if self.select_cell_point_ids[point_id] == 1:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[4][0]))
-                elif self.select_cell_point_ids[point_id] == 2:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                elif self.select_cell_point_ids[point_id] == 3:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                elif self.select_cell_point_ids[point_id] == 4:
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[5][0]))
-                elif self.select_cell_point_ids[point_id] == 5:
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[4][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[5][0]))
-                elif self.select_cell_point_ids[point_id] == 6:
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[4][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[5][0]))
-                elif self.select_cell_point_ids[point_id] == 7:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[4][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[5][0]))
-                elif self.select_cell_point_ids[point_id] == 8:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[4][0]))
-                elif self.select_cell_point_ids[point_id] == 9:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                elif self.select_cell_point_ids[point_id] == 10:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[5][0]))
-                elif self.select_cell_point_ids[point_id] == 11:
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[4][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[5][0]))
-                elif self.select_cell_point_ids[point_id] == 12:
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[4][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[5][0]))
-                elif self.select_cell_point_ids[point_id] == 13:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[4][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[5][0]))
-                elif self.select_cell_point_ids[point_id] == 14:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[4][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[5][0]))
-                elif self.select_cell_point_ids[point_id] == 15:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[4][0]))
-                elif self.select_cell_point_ids[point_id] == 16:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[5][0]))
-                elif self.select_cell_point_ids[point_id] == 17:
-                    cell_remove.append(cl.GetId(cell_bounds_center[0][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[4][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[5][0]))
-                elif self.select_cell_point_ids[point_id] == 18:
-                    cell_remove.append(cl.GetId(cell_bounds_center[1][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[2][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[3][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[4][0]))
-                    cell_remove.append(cl.GetId(cell_bounds_center[5][0]))
-            for cell in cell_remove:
-                self.select_cell_ids.remove(cell)
-            self.selection_node.SetSelectionList(set_to_id_type_array(self.select_cell_ids))
-            self.ren_win.Render()
+        if self.is_center_selected(point_id):
+            self.apply_shape([point_id], shape)
+
+    @traced
+    def apply_shape(self, point_ids, shape):
+        # Sets the shape of every selected center in point_ids in one pass and renders once.
+        # shape is a single shape code or one per point id; unselected centers are skipped.
+        index = np.asarray(point_ids, dtype=np.int64).reshape(-1) - self.lattice.num_nodes
+        shapes = np.broadcast_to(np.asarray(shape, dtype=np.int64) % len(self.shape_table), index.shape)
+        selected = self.center_shapes[index] >= 0
+        index = index[selected]
+        shapes = shapes[selected]
+        if index.size == 0:
+            return
+        self.edit_center_shapes(index, shapes.astype(np.int8))
+
+    def get_boundary_centers(self):
+        # selected centers with at least one neighbour that is unselected or outside the grid
+        neighbors = self.lattice.center_neighbors
+        selected = self.center_shapes >= 0
+        neighbor_selected = (neighbors >= 0) & selected[np.maximum(neighbors - self.lattice.num_nodes, 0)]
+        return np.flatnonzero(selected & ~neighbor_selected.all(axis=1)) + self.lattice.num_nodes
 
     def get_right_click_callback(self, point_id):
         self.context_pass_point_id = point_id
-        if point_id in self.select_cell_point_ids:
-            if self.current_grid_type == 0:
-                self.context_menu_count = 9
-            elif self.current_grid_type == 1:
-                self.context_menu_count = 19
+        if self.is_center_selected(point_id):
+            self.context_menu_count = len(self.shape_table)
         else:
             self.context_menu_count = 0
 
     def get_number_context_menu(self):
         return self.context_pass_point_id, self.context_menu_count
 
-    def regenerate_unstructured_grid(self):
-        output_grid = vtkUnstructuredGrid()
-        for key in self.select_cell_point_ids.keys():
-            cell_array = vtkIdList()
-            self.grid_data.GetPointCells(key, cell_array)
-            dict_points = {}
-            for idx in range(cell_array.GetNumberOfIds()):
-                if cell_array.GetId(idx) in self.select_cell_ids:
-                    point_array = vtkIdList()
-                    self.grid_data.GetCellPoints(cell_array.GetId(idx), point_array)
-                    for pt_arr_idx in range(point_array.GetNumberOfIds()):
-                        if self.select_cell_point_ids[key] < 5:
-                            if point_array.GetId(pt_arr_idx) < GRID_SIZE * GRID_SIZE:
-                                dict_points[point_array.GetId(pt_arr_idx)] = self.grid_data \
-                                    .GetPoint(point_array.GetId(pt_arr_idx))
-                        else:
-                            dict_points[point_array.GetId(pt_arr_idx)] = self.grid_data \
-                                .GetPoint(point_array.GetId(pt_arr_idx))
-            list_sorted = sorted(dict_points.items(), key=lambda item: item[1], reverse=True)
-            list_points = []
-            for point in list_sorted:
-                list_points.append(point[0])
-            if len(list_points) == 3:
-                if self.select_cell_point_ids[key] == 3 or self.select_cell_point_ids[key] == 4 or \
-                        self.select_cell_point_ids[key] == 6 or self.select_cell_point_ids[key] == 7:
-                    temp = list_points[2]
-                    list_points[2] = list_points[1]
-                    list_points[1] = temp
-                output_grid.InsertNextCell(5, 3, list_points)  # 5 : vtkCellTypes::VTK_TRIANGLE
-            elif len(list_points) == 4:
-                temp = list_points[3]
-                list_points[3] = list_points[2]
-                list_points[2] = temp
-                output_grid.InsertNextCell(9, 4, list_points)  # 9 : vtkCellTypes:VTK_QUAD
-            else:
-                print('something wrong: ', list_points)
-        output_grid.SetPoints(self.grid_data.GetPoints())
-
-        return output_grid
-
-    def check_save_possible(self):
-        if self.extract_selection.GetOutput().GetNumberOfCells() == 0:
-            return False
-        elif self.extract_selection.GetOutput().GetNumberOfPoints() == 0:
-            return False
-        return True
+    def regenerate_mesh(self):
+        return regenerate_mesh(self.lattice, self.current_grid_type, self.center_shapes)
 
-    def save_ply(self, path='test.ply'):
-        if self.extract_selection.GetOutput().GetNumberOfCells() == 0:
+    def regenerate_unstructured_grid(self):
+        return mesh_to_unstructured_grid(*self.regenerate_mesh())
+
+    def check_save_possible(self, merged=False):
+        # something to export: the mesh of the selection has at least one polygon
+        return not self.export_snapshot(merged).is_empty()
+
+    def export_snapshot(self, merged=False):
+        # the active layer, or all layers as one mesh with merged
+        snapshots = [ExportSnapshot(self.lattice, self.current_grid_type, self.current_interactor_style,
+                                    layer.center_shapes, layer.node_polygon.ids)
+                     for layer in (self.layers if merged else [self.layer])]
+        return MergedSnapshot(snapshots) if merged else snapshots[0]
+
+    def export_mesh(self):
+        # the polygons to export as (points, offsets, connectivity) buffers
+        return self.export_snapshot().build_mesh()
+
+    @traced
+    def save_mesh(self, path, file_format=None, merged=False):
+        # file_format is one of export.EXPORT_FORMATS, by default taken from the file extension
+        if not self.check_save_possible(merged):
             return -1
-        writer = vtkPLYWriter()
-        writer.SetFileName(path)
-
-        if self.current_interactor_style == 0 and self.current_grid_type == 0:
-            surface_filter = vtkDataSetSurfaceFilter()
-            surface_filter.SetInputData(self.regenerate_unstructured_grid())
-            writer.SetInputConnection(surface_filter.GetOutputPort())
-        elif self.current_interactor_style == 0 and self.current_grid_type == 1:
-            surface_filter = vtkDataSetSurfaceFilter()
-            surface_filter.SetInputConnection(self.extract_selection.GetOutputPort())
-            writer.SetInputConnection(surface_filter.GetOutputPort())
-        elif self.current_interactor_style == 1:
-            enclosed = vtkSelectEnclosedPoints()
-            enclosed.SetInputData(self.grid_data)
-            enclosed.SetSurfaceData(self.selected_node_polydata)
-            enclosed.Update()
-
-            enclosed_points = vtkPoints()
-            for i in range(self.grid_data.GetNumberOfPoints()):
-                if enclosed.IsInside(i) == 1:
-                    enclosed_points.InsertNextPoint(self.grid_data.GetPoint(i))
-
-            new_ca = vtkCellArray()
-            new_ca.InsertNextCell(self.selected_node_polydata.GetCell(0))
-
-            enclosed_poly = vtkPolyData()
-            enclosed_poly.SetPoints(enclosed_points)
-            enclosed_poly.SetPolys(new_ca)
-
-            # Triangulate the grid points
-            delaunay = vtkDelaunay2D()
-            delaunay.SetInputData(enclosed_poly)
-            delaunay.Update()
-
-            writer.SetInputConnection(delaunay.GetOutputPort(0))
-
-        writer.SetFileTypeToASCII()
-        return writer.Write()
+        return self.export_snapshot(merged).run(path, file_format)
+
+    def save_ply(self, path='test.ply', file_format='ply'):
+        return self.save_mesh(path, file_format)
+
+    def save_session(self, path):
+        write_session(path, self.current_grid_type, self.current_interactor_style, self.grid_size, self.cell_mask,
+                      self.point_mask, self.center_shapes, self.node_polygon.ids)
+
+    @traced
+    def load_session(self, path):
+        # the current selection stays as it is unless the whole session is valid
+        session = read_session(path)
+        lattice = self.grid_cache.get(session.grid_type, session.grid_size).lattice
+        session.check(lattice)
+
+        self.grid_size = session.grid_size
+        self.init_view(session.grid_type, session.interactor_style)
+        self.center_shapes[:] = session.center_shapes
+        self.cell_mask[:] = session.cell_mask()[session.line_cells(lattice):]
+        self.cells_modified = True
+        self.node_polygon.assign(session.polygon_ids)
+        self.node_polygon_modified()
 
     def init_quad_grid(self):
-        # Create points on an XY grid with random Z coordinate
-        points = vtkPoints()
-        grid_size = GRID_SIZE
-
-        self.selection_node.SetFieldType(vtkSelectionNode.CELL)
-        self.selection_node.SetContentType(vtkSelectionNode.INDICES)
-        self.selection.AddNode(self.selection_node)
-
-        ca = vtkCellArray()
-        for y in range(0, grid_size):
-            poly_line = vtkPolyLine()
-            for x in range(0, grid_size):
-                points.InsertNextPoint(x, y, 0)
-                poly_line.GetPointIds().InsertNextId(y * grid_size + x)
-            ca.InsertNextCell(poly_line)
-
-        for x in range(0, grid_size):
-            poly_line = vtkPolyLine()
-            for y in range(0, grid_size):
-                poly_line.GetPointIds().InsertNextId(y * grid_size + x)
-            ca.InsertNextCell(poly_line)
-
-        self.center_points.clear()
-        c_point = points.GetNumberOfPoints()
-        for j in range(0, grid_size - 1):
-            for i in range(0, grid_size - 1):
-                points.InsertNextPoint(i + 0.5, j + 0.5, 0)
-                self.center_points.add(c_point)
-                c_point = c_point + 1
-
-        # Add the grid points to a polyData object
-        poly_data = vtkPolyData()
-        poly_data.SetPoints(points)
-
-        # poly_grid_line = vtkPolyData()
-        # poly_grid_line.SetPoints(points)
-        # poly_grid_line.SetLines(ca)
-        #
-        # grid_line_mapper = vtkPolyDataMapper()
-        # grid_line_mapper.SetInputData(poly_grid_line)
-        #
-        # grid_line_actor = vtkActor()
-        # grid_line_actor.SetMapper(grid_line_mapper)
-        # grid_line_actor.GetProperty().SetColor(self.colors.GetColor3d("Black"))
-        # grid_line_actor.GetProperty().SetLineWidth(3)
-        # grid_line_actor.PickableOff()
-
-        # Triangulate the grid points
-        delaunay = vtkDelaunay2D()
-        delaunay.SetInputData(poly_data)
-        delaunay.Update()
-
-        self.grid_data.ShallowCopy(delaunay.GetOutput())
-        self.grid_data.SetLines(ca)
-        self.selected_node_polydata.SetPoints(points)
+        self.init_grid(0)
 
-        self.selected_polygon_mapper.SetInputData(self.selected_node_polydata)
+    def init_hexagon_grid(self):
+        self.init_grid(1)
 
-        self.selected_polygon_actor.SetMapper(self.selected_polygon_mapper)
-        self.selected_polygon_actor.GetProperty().EdgeVisibilityOff()
-        self.selected_polygon_actor.GetProperty().SetColor(self.colors.GetColor3d('Plum'))
-
-        # Create a mapper and actor
-        triangulated_mapper = vtkPolyDataMapper()
-        triangulated_mapper.SetInputData(self.grid_data)
-
-        triangulated_actor = vtkActor()
-        triangulated_actor.SetMapper(triangulated_mapper)
-        triangulated_actor.GetProperty().SetColor(self.colors.GetColor3d('Black'))
-        triangulated_actor.GetProperty().SetOpacity(0.3)
-        triangulated_actor.GetProperty().SetLineWidth(3)
-
-        # renderer.AddActor(pointsActor)
-        # self.ren.AddActor(grid_line_actor)
-        self.ren.AddActor(triangulated_actor)
-        self.ren.AddActor(self.selected_actor)
-        self.ren.AddActor(self.selected_polygon_actor)
-        # renderer.ResetCamera()
+    def init_grid(self, grid_type):
+        grid = self.grid_cache.get(grid_type, self.grid_size)
+        self.lattice = grid.lattice
+        self.center_points = self.lattice.center_points
 
-    def init_hexagon_grid(self):
-        # Create points on an XY grid with random Z coordinate
-        points = vtkPoints()
-        grid_size = (GRID_SIZE if GRID_SIZE % 2 == 0 else GRID_SIZE - 1) * 3
-
-        self.selection_node.SetFieldType(vtkSelectionNode.CELL)
-        self.selection_node.SetContentType(vtkSelectionNode.INDICES)
-        self.selection.AddNode(self.selection_node)
-
-        for y in range(0, grid_size):
-            for x in range(0, grid_size):
-                if y % 2 == 0 and x % 2 == 1:
-                    points.InsertNextPoint(x * 0.5, y * math.sin(math.pi / 3), 0)
-                elif y % 2 == 1 and x % 2 == 0:
-                    points.InsertNextPoint(x * 0.5, y * math.sin(math.pi / 3), 0)
-
-        ca_line = vtkCellArray()
-        half = math.floor(grid_size / 2)
-        remain = half % 3
-        for j in range(half - 1):
-            i = 0
-            while i < grid_size - 1:
-                polyline = vtkPolyLine()
-                polyline.GetPointIds().SetNumberOfIds(7)
-                if i <= half <= i + 3:
-                    i = i + 3
-                    continue
-                elif i < half:
-                    polyline.GetPointIds().SetId(0, j * grid_size + i)
-                    polyline.GetPointIds().SetId(1, j * grid_size + i + 1)
-                    polyline.GetPointIds().SetId(2, j * grid_size + i + half + 2)
-                    polyline.GetPointIds().SetId(3, (j + 1) * grid_size + i + 1)
-                    polyline.GetPointIds().SetId(4, (j + 1) * grid_size + i)
-                    polyline.GetPointIds().SetId(5, j * grid_size + i + half)
-                    polyline.GetPointIds().SetId(6, j * grid_size + i)
-                elif i > half:
-                    polyline.GetPointIds().SetId(0, j * grid_size + i - 1 + remain)
-                    polyline.GetPointIds().SetId(1, j * grid_size + i + remain)
-                    polyline.GetPointIds().SetId(2, j * grid_size + i + half + remain)
-                    polyline.GetPointIds().SetId(3, (j + 1) * grid_size + i + remain)
-                    polyline.GetPointIds().SetId(4, (j + 1) * grid_size + i - 1 + remain)
-                    polyline.GetPointIds().SetId(5, j * grid_size + i + half + remain - 2)
-                    polyline.GetPointIds().SetId(6, j * grid_size + i - 1 + remain)
-                ca_line.InsertNextCell(polyline)
-                i = i + 3
-
-        center_points0 = []
-        i = 0
-        while i < grid_size - 1:
-            if i <= half <= i + 3:
-                i = i + 3
-                continue
-            elif i < half:
-                center_points0.append(half + 1 + i)
-            elif i > half:
-                center_points0.append(half + remain - 1 + i)
-            i = i + 3
-
-        self.center_points.clear()
-        for pid in center_points0:
-            self.center_points.add(int(pid))
-            iteration = grid_size
-            while iteration < points.GetNumberOfPoints():
-                if pid + iteration < points.GetNumberOfPoints():
-                    self.center_points.add(int(pid + iteration))
-                iteration = iteration + grid_size
-
-        # Add the grid points to a polyData object
-        poly_data = vtkPolyData()
-        poly_data.SetPoints(points)
-
-        delaunay = vtkDelaunay2D()
-        delaunay.SetInputData(poly_data)
-        delaunay.Update()
-
-        poly = vtkPolyData()
-        poly.DeepCopy(delaunay.GetOutput())
-        poly.SetLines(ca_line)
-
-        self.grid_data.ShallowCopy(poly)
-
-        mapper = vtkPolyDataMapper()
-        mapper.SetInputData(self.grid_data)
-
-        actor = vtkActor()
-        actor.SetMapper(mapper)
-        actor.GetProperty().SetColor(self.colors.GetColor3d('Black'))
-        actor.GetProperty().SetOpacity(0.3)
-        actor.GetProperty().SetLineWidth(3)
-
-        self.selected_node_polydata.SetPoints(points)
+        self.grid_data.ShallowCopy(grid.poly_data)
+        self.selected_node_polydata.SetPoints(self.grid_data.GetPoints())
 
         self.selected_polygon_mapper.SetInputData(self.selected_node_polydata)
 
         self.selected_polygon_actor.SetMapper(self.selected_polygon_mapper)
         self.selected_polygon_actor.GetProperty().EdgeVisibilityOff()
-        self.selected_polygon_actor.GetProperty().SetColor(self.colors.GetColor3d('Plum'))
-
-        self.ren.AddActor(actor)
-        self.ren.AddActor(self.selected_actor)
+        self.selected_polygon_actor.GetProperty().RenderPointsAsSpheresOn()
+        self.selected_polygon_actor.GetProperty().SetPointSize(10.0)
+
+        self.grid_view = None
+        self.grid_locator = None
+        if self.ren_win is None:
+            pass  # nothing is drawn headless
+        elif LATTICE_PICKING:
+            self.grid_view = GridView(self.lattice, self.grid_lookup_table)
+            self.grid_view.add_to(self.ren)
+        else:
+            # ray cast picking needs the whole grid_data in one actor
+            self.ren.AddActor(make_grid_actor(self.grid_data, self.grid_lookup_table))
+            self.ren.AddActor(make_line_actor(grid.line_data, self.grid_lookup_table))
+            # built once per grid, the selection arrays changing must not rebuild it
+            self.grid_locator = vtkStaticCellLocator()
+            self.grid_locator.SetDataSet(self.grid_data)
+            self.grid_locator.BuildLocator()
+            self.grid_locator.UseExistingSearchStructureOn()
         self.ren.AddActor(self.selected_polygon_actor)